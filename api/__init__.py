@@ -1,6 +1 @@
-# Fichier laissé vide ou avec seulement :
-from flask import Flask
-
-app = Flask(__name__)
-
-# Pas d'import de app ici pour éviter les circulaires
\ No newline at end of file
+# Paquet de l'API : l'application est créée par create_app() dans api/app.py
@@ -0,0 +1,235 @@
+import os
+import sqlite3
+import threading
+import time
+
+from storage import connect
+
+
+# ==================== CONFIGURATION ====================
+
+# Threads par worker gunicorn (gthread, voir gunicorn.conf.py)
+WORKER_THREADS = int(os.getenv('GUNICORN_THREADS', 8))
+
+# Requêtes lourdes (extraction yt-dlp + Deno) exécutées en parallèle par worker :
+# une seule, comme les anciens workers sync, pour ne pas surcharger une petite instance
+MAX_INFLIGHT = int(os.getenv('ADMISSION_MAX_INFLIGHT', 1))
+
+# Requêtes lourdes en attente par worker ; au-delà : 503 immédiat
+MAX_QUEUE = int(os.getenv('ADMISSION_MAX_QUEUE', 2))
+
+# Long-polls simultanés (GET /api/jobs/<id>?wait=) par worker ; au-delà, réponse immédiate.
+# MAX_INFLIGHT + MAX_QUEUE + MAX_LONG_POLLS laisse 2 threads libres pour /api/health
+MAX_LONG_POLLS = int(os.getenv('ADMISSION_MAX_LONG_POLLS',
+                               max(0, WORKER_THREADS - MAX_INFLIGHT - MAX_QUEUE - 2)))
+
+# Attente maximale dans la file (secondes), bien en dessous du timeout gunicorn
+QUEUE_TIMEOUT = float(os.getenv('ADMISSION_QUEUE_TIMEOUT', 3))
+
+# Chaque worker republie sa charge à cet intervalle, même inactif (secondes)
+HEARTBEAT_INTERVAL = 10
+
+# Un worker sans nouvelles depuis ce délai n'est plus compté (bloqué ou disparu)
+WORKER_STALE_AFTER = 3 * HEARTBEAT_INTERVAL
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS workers (
+    pid INTEGER PRIMARY KEY,
+    inflight INTEGER NOT NULL,
+    queued INTEGER NOT NULL,
+    long_polls INTEGER NOT NULL,
+    updated REAL NOT NULL
+);
+'''
+
+
+class Overloaded(Exception):
+    """Levée quand le budget de requêtes lourdes du worker est épuisé."""
+
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+# ==================== CONTRÔLE D'ADMISSION ====================
+
+class AdmissionController:
+    """
+    Budget borné de requêtes lourdes : MAX_INFLIGHT en cours, MAX_QUEUE en attente.
+    Les requêtes en trop sont refusées tout de suite plutôt que d'attendre le timeout.
+    """
+
+    def __init__(self, max_inflight=MAX_INFLIGHT, max_queue=MAX_QUEUE, queue_timeout=QUEUE_TIMEOUT,
+                 max_long_polls=MAX_LONG_POLLS):
+        self.max_inflight = max_inflight
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.max_long_polls = max_long_polls
+        self.inflight = 0
+        self.queued = 0
+        self.long_polls = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.avg_duration = 2.0  # moyenne glissante du temps de traitement (secondes)
+        self._cond = threading.Condition()
+
+    def retry_after(self):
+        """Délai estimé avant qu'une place se libère (secondes, au moins 1)."""
+        backlog = (self.inflight + self.queued) / max(1, self.max_inflight)
+        return max(1, int(backlog * self.avg_duration + 0.5))
+
+    def acquire(self):
+        """Réserve une place ou lève Overloaded. Retourne l'instant d'admission."""
+        with self._cond:
+            if self.inflight < self.max_inflight:
+                self.inflight += 1
+                self.admitted += 1
+                started = time.monotonic()
+                queued = False
+            elif self.queued >= self.max_queue:
+                self.rejected += 1
+                raise Overloaded('Serveur surchargé, réessayez plus tard', self.retry_after())
+            else:
+                self.queued += 1
+                queued = True
+        self.publish()
+        if not queued:
+            return started
+
+        try:
+            with self._cond:
+                deadline = time.monotonic() + self.queue_timeout
+                try:
+                    while self.inflight >= self.max_inflight:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            self.rejected += 1
+                            raise Overloaded("Délai d'attente dépassé, réessayez plus tard",
+                                             self.retry_after())
+                        self._cond.wait(remaining)
+                finally:
+                    self.queued -= 1
+
+                self.inflight += 1
+                self.admitted += 1
+                return time.monotonic()
+        finally:
+            self.publish()
+
+    def release(self, started):
+        with self._cond:
+            self.inflight -= 1
+            self.avg_duration = 0.8 * self.avg_duration + 0.2 * (time.monotonic() - started)
+            self._cond.notify()
+        self.publish()
+
+    def enter_long_poll(self):
+        """Réserve un long-poll. Faux si le plafond est atteint (réponse immédiate)."""
+        with self._cond:
+            if self.long_polls >= self.max_long_polls:
+                return False
+            self.long_polls += 1
+        self.publish()
+        return True
+
+    def leave_long_poll(self):
+        with self._cond:
+            self.long_polls -= 1
+        self.publish()
+
+    def publish(self):
+        """Écrit la charge du worker dans SQLite (vue de l'instance, voir instance_load)."""
+        with self._cond:
+            row = (os.getpid(), self.inflight, self.queued, self.long_polls, time.time())
+        try:
+            _db().execute(
+                'INSERT OR REPLACE INTO workers (pid, inflight, queued, long_polls, updated) '
+                'VALUES (?, ?, ?, ?, ?)', row
+            )
+        except sqlite3.Error as e:
+            print(f"⚠️  Publication de la charge impossible ({e})")
+
+    def start_heartbeat(self, interval=HEARTBEAT_INTERVAL):
+        """Publie tout de suite puis périodiquement : un worker inactif reste compté."""
+        def beat():
+            while True:
+                self.publish()
+                time.sleep(interval)
+
+        threading.Thread(target=beat, name='admission-heartbeat', daemon=True).start()
+
+    def forget(self):
+        """Retire le worker de la vue de l'instance (arrêt propre)."""
+        try:
+            _db().execute('DELETE FROM workers WHERE pid = ?', (os.getpid(),))
+        except sqlite3.Error:
+            pass
+
+    def stats(self):
+        with self._cond:
+            return {
+                'pid': os.getpid(),
+                'inflight': self.inflight,
+                'queued': self.queued,
+                'longPolls': self.long_polls,
+                'maxInflight': self.max_inflight,
+                'maxQueue': self.max_queue,
+                'maxLongPolls': self.max_long_polls,
+                'admitted': self.admitted,
+                'rejected': self.rejected,
+                'avgDuration': round(self.avg_duration, 2),
+            }
+
+
+def _db():
+    return connect('admission', SCHEMA)
+
+
+def _is_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        return True
+    return True
+
+
+def instance_load():
+    """
+    Charge cumulée des workers de l'instance, ou None si SQLite est indisponible.
+    Les lignes des workers tués (processus disparu) sont supprimées sans attendre
+    WORKER_STALE_AFTER.
+    """
+    try:
+        conn = _db()
+        rows = conn.execute(
+            'SELECT pid, inflight, queued, long_polls FROM workers WHERE updated > ?',
+            (time.time() - WORKER_STALE_AFTER,)
+        ).fetchall()
+        dead = [row['pid'] for row in rows if not _is_alive(row['pid'])]
+        if dead:
+            conn.executemany('DELETE FROM workers WHERE pid = ?', [(pid,) for pid in dead])
+    except sqlite3.Error:
+        return None
+    rows = [row for row in rows if row['pid'] not in dead]
+    return {
+        'workers': len(rows),
+        'inflight': sum(row['inflight'] for row in rows),
+        'queued': sum(row['queued'] for row in rows),
+        'longPolls': sum(row['long_polls'] for row in rows),
+    }
+
+
+_controller = None
+_controller_lock = threading.Lock()
+
+
+def get_admission_controller():
+    """Contrôleur du worker, construit au premier appel (après le fork gunicorn)."""
+    global _controller
+    if _controller is None:
+        with _controller_lock:
+            if _controller is None:
+                _controller = AdmissionController()
+    return _controller
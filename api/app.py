@@ -1,50 +1,202 @@
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Blueprint, Flask, request, jsonify
 from flask_cors import CORS
+import importlib.util
 import os
 import sys
+import threading
 
 # Ajouter le répertoire courant au path Python
 sys.path.append(os.path.dirname(__file__))
 
-app = Flask(__name__, static_folder='..', static_url_path='')
-
-CORS(app, resources={
-    r"/api/*": {
-        "origins": "*",
-        "methods": ["GET", "POST", "OPTIONS"],
-        "allow_headers": ["Content-Type"]
-    }
-})
-
-# Import des fonctions de sous-titres
-try:
-    from subtitles import get_subtitles, SubtitleError, get_available_languages
-    subtitles_available = True
-    print("✅ Module subtitles chargé avec support cookies")
-except ImportError as e:
-    print(f"❌ Erreur: subtitles non disponible: {e}")
-    subtitles_available = False
+# Modules légers (stdlib + SQLite) : importés tout de suite
+from admission import Overloaded, get_admission_controller, instance_load
+from cache import is_cached
+from errors import SubtitleError
+from http_cache import compress_response, content_etag, subtitles_cache_control
+from proxies import get_proxy_pool
+from cookies import get_cookie_pool
+from ratelimit import RateLimitTimeout, stats as rate_limit_stats
+from prefetch import QueueFull, enqueue as enqueue_prefetch, is_valid_language, queue_size as prefetch_queue_size
+from jobs import JOB_RESULTS_PAGE, JobError, JobQueueFull, create_job, get_job_results, wait_for_job
+from static_assets import serve_public
+
+bp = Blueprint('main', __name__)
+
+# Nombre maximal de langues par requête multi-langues
+MAX_LANGUAGES = 8
+
+# yt-dlp est présent ? (vérification sans l'importer)
+subtitles_available = importlib.util.find_spec('yt_dlp') is not None
+
+_extractor = None
+_extractor_lock = threading.Lock()
+
+
+def extractor():
+    """
+    Pile d'extraction (subtitles.py + yt-dlp), chargée au premier besoin :
+    /api/health répond sans attendre l'import de yt-dlp.
+    """
+    global _extractor
+    if _extractor is None:
+        with _extractor_lock:
+            if _extractor is None:
+                import subtitles
+                _extractor = subtitles
+                print("✅ Module subtitles chargé avec support cookies")
+    return _extractor
+
+
+def parse_since(params):
+    """Curseur du mode incrémental ('since' ou 'cursor' = tStartMs du dernier segment reçu)."""
+    value = params.get('since', params.get('cursor'))
+    if value is None or value == '':
+        return None
+    return int(value)
+
+
+def parse_languages(value):
+    """Liste de langues : tableau JSON ou chaîne 'fr,en' (GET). ValueError si invalide."""
+    if value is None or value == '':
+        return None
+    if isinstance(value, str):
+        value = value.split(',')
+    if not isinstance(value, list) or not all(isinstance(lang, str) for lang in value):
+        raise ValueError('languages doit être une liste de codes langue')
+    languages = [lang.strip() for lang in value if lang.strip()]
+    return list(dict.fromkeys(languages))[:MAX_LANGUAGES] or None
+
+
+def load_subtitles(video_id, format_type, language, since=None, languages=None, bilingual=False):
+    """
+    Mode simple (une langue, éventuellement incrémental) ou multi-langues.
+    Les extractions passent par le contrôle d'admission ; sous surcharge, une
+    transcription expirée du cache est servie si elle existe, sinon Overloaded.
+    """
+    option_error = check_options(format_type, languages, bilingual, since)
+    if option_error:
+        raise ValueError(option_error)
+
+    # Transcription fraîche en cache : réponse bon marché, pas de budget consommé
+    if not languages and is_cached(video_id, language):
+        return extractor().get_subtitles(video_id, format_type, language, since=since)
+
+    admission = get_admission_controller()
+    try:
+        started = admission.acquire()
+    except Overloaded:
+        stale = None if languages else extractor().get_stale_subtitles(video_id, format_type, language, since)
+        if stale is None:
+            raise
+        print(f"🪫 Surcharge : sous-titres expirés servis depuis le cache ({video_id})")
+        return stale
+
+    try:
+        if languages:
+            return extractor().get_subtitles_multi(video_id, format_type, languages, bilingual)
+        return extractor().get_subtitles(video_id, format_type, language, since=since)
+    finally:
+        admission.release(started)
+
+
+def check_options(format_type, languages, bilingual, since):
+    """Message d'erreur si les options multi-langues sont incompatibles, sinon None."""
+    if languages and since is not None:
+        return 'Le mode incrémental (since) ne gère qu\'une seule langue'
+    if not bilingual:
+        return None
+    if format_type not in ('srt', 'vtt'):
+        return 'Le mode bilingue nécessite le format srt ou vtt'
+    if not languages or len(languages) < 2:
+        return 'Le mode bilingue nécessite au moins deux langues'
+    return None
+
+
+def too_many_requests(error):
+    """Réponse 429 quand une file de travail (préchargement, jobs) est pleine."""
+    response = jsonify({'error': str(error), 'retryAfter': error.retry_after})
+    response.headers['Retry-After'] = str(error.retry_after)
+    return response, 429
+
+
+def rate_limited(error):
+    """Réponse 503 quand le limiteur de débit amont ou le contrôle d'admission refuse la requête."""
+    response = jsonify({'error': str(error), 'retryAfter': error.retry_after})
+    response.headers['Retry-After'] = str(error.retry_after)
+    return response, 503
+
+
+def compress_api_response(response):
+    if request.path.startswith('/api/'):
+        return compress_response(request, response)
+    return response
+
+
+def create_app():
+    """Fabrique de l'application (gunicorn charge api.app:app)."""
+    # Pas de dossier statique Flask : serve_static passe d'abord par dist/ (build_assets.py)
+    app = Flask(__name__, static_folder=None)
+
+    CORS(app, resources={
+        r"/api/*": {
+            "origins": "*",
+            "methods": ["GET", "POST", "OPTIONS"],
+            "allow_headers": ["Content-Type", "If-None-Match"],
+            "expose_headers": ["ETag", "Retry-After"]
+        }
+    })
+
+    app.register_blueprint(bp)
+    app.after_request(compress_api_response)
+
+    if not subtitles_available:
+        print("❌ Erreur: subtitles non disponible: yt-dlp introuvable")
+
+    # Comptes cookies chargés une seule fois (dans le master avec --preload)
+    get_cookie_pool()
+    return app
 
 # Routes...
-@app.route('/')
+@bp.route('/')
 def serve_index():
-    return send_from_directory('..', 'index.html')
+    return serve_public('index.html')
 
-@app.route('/<path:path>')
+@bp.route('/<path:path>')
 def serve_static(path):
-    return send_from_directory('..', path)
+    return serve_public(path)
 
-@app.route('/api/health', methods=['GET'])
+@bp.route('/api/health', methods=['GET'])
 def health_check():
+    # Charge de l'instance (tous les workers), à défaut celle du worker qui répond
+    load = instance_load()
+    if load is None:
+        worker = get_admission_controller().stats()
+        load = {'workers': 1, 'inflight': worker['inflight'], 'queued': worker['queued']}
     return jsonify({
         'status': 'ok',
         'service': 'YT Creator Tools API',
         'version': '2.0.0',
         'subtitles_available': subtitles_available,
-        'cookies_method': 'yt-dlp_with_cookies'
+        'cookies_method': 'yt-dlp_with_cookies',
+        'activeWorkers': load['workers'],
+        'inflight': load['inflight'],
+        'queueDepth': load['queued']
     }), 200
 
-@app.route('/api/subtitles', methods=['POST', 'OPTIONS'])
+@bp.route('/api/stats', methods=['GET'])
+def stats():
+    if not subtitles_available:
+        return jsonify({'error': 'Service indisponible'}), 503
+
+    return jsonify({
+        'proxies': get_proxy_pool().stats(),
+        'cookies': get_cookie_pool().stats(),
+        'rateLimits': rate_limit_stats(),
+        'admission': {'worker': get_admission_controller().stats(), 'instance': instance_load()},
+        'prefetchQueue': prefetch_queue_size()
+    }), 200
+
+@bp.route('/api/subtitles', methods=['POST', 'OPTIONS'])
 def get_video_subtitles():
     if request.method == 'OPTIONS':
         return '', 200
@@ -62,25 +214,47 @@ def get_video_subtitles():
         if not video_id:
             return jsonify({'error': 'videoId manquant'}), 400
         
+        try:
+            since = parse_since(data)
+        except (TypeError, ValueError):
+            return jsonify({'error': 'Curseur invalide'}), 400
+        
+        try:
+            languages = parse_languages(data.get('languages'))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        bilingual = bool(data.get('bilingual'))
+        
         valid_formats = ['txt', 'srt', 'vtt']
         if format_type not in valid_formats:
             return jsonify({
                 'error': f'Format invalide. Formats acceptés: {", ".join(valid_formats)}'
             }), 400
         
+        option_error = check_options(format_type, languages, bilingual, since)
+        if option_error:
+            return jsonify({'error': option_error}), 400
+        
         if not subtitles_available:
             return jsonify({'error': 'Service de sous-titres temporairement indisponible'}), 503
         
+        # Mode asynchrone : on rend la main tout de suite avec un ID de job
+        if data.get('async'):
+            return submit_job(data)
+        
         try:
             print(f"🎯 Demande de sous-titres avec cookies: {video_id}")
-            result = get_subtitles(video_id, format_type, language)
-            print(f"✅ Sous-titres récupérés: {result['lineCount']} lignes")
+            result = load_subtitles(video_id, format_type, language, since, languages, bilingual)
+            print(f"✅ Sous-titres récupérés: {result.get('lineCount', len(result.get('tracks', [])))} "
+                  f"{'lignes' if 'lineCount' in result else 'pistes'}")
             return jsonify(result), 200
         except SubtitleError as e:
             print(f"❌ Erreur sous-titres: {e}")
             return jsonify({
                 'error': f'Impossible de récupérer les sous-titres: {str(e)}'
             }), 404
+        except (RateLimitTimeout, Overloaded) as e:
+            return rate_limited(e)
     
     except Exception as e:
         print(f"🔥 Erreur serveur: {e}")
@@ -89,13 +263,155 @@ def get_video_subtitles():
             'details': str(e) if os.getenv('FLASK_ENV') == 'development' else None
         }), 500
 
-@app.route('/api/subtitles/languages/<video_id>', methods=['GET'])
+@bp.route('/api/subtitles', methods=['GET'])
+def get_cacheable_subtitles():
+    """Variante GET cacheable : ETag sur le contenu, Cache-Control et 304."""
+    video_id = request.args.get('videoId')
+    format_type = request.args.get('format', 'txt')
+    language = request.args.get('language', 'fr')
+
+    if not video_id:
+        return jsonify({'error': 'videoId manquant'}), 400
+
+    if format_type not in ('txt', 'srt', 'vtt'):
+        return jsonify({'error': 'Format invalide. Formats acceptés: txt, srt, vtt'}), 400
+
+    try:
+        since = parse_since(request.args)
+    except ValueError:
+        return jsonify({'error': 'Curseur invalide'}), 400
+
+    languages = parse_languages(request.args.get('languages'))
+    bilingual = request.args.get('bilingual', '').lower() in ('1', 'true')
+    option_error = check_options(format_type, languages, bilingual, since)
+    if option_error:
+        return jsonify({'error': option_error}), 400
+
+    if not subtitles_available:
+        return jsonify({'error': 'Service de sous-titres temporairement indisponible'}), 503
+
+    try:
+        result = load_subtitles(video_id, format_type, language, since, languages, bilingual)
+    except SubtitleError as e:
+        return jsonify({'error': f'Impossible de récupérer les sous-titres: {str(e)}'}), 404
+    except (RateLimitTimeout, Overloaded) as e:
+        return rate_limited(e)
+
+    response = jsonify(result)
+    # ETag faible d'emblée : identique sur le 200 (compressé ou non) et sur le 304
+    response.set_etag(content_etag(result), weak=True)
+    # Un live change à chaque poll, une copie expirée doit être revalidée : pas de cache
+    revalidate = result.get('isLive') or result.get('stale')
+    response.headers['Cache-Control'] = 'no-cache' if revalidate else subtitles_cache_control()
+    return response.make_conditional(request)
+
+def submit_job(data):
+    try:
+        job_id = create_job(data)
+    except JobError as e:
+        return jsonify({'error': str(e)}), 400
+    except JobQueueFull as e:
+        return too_many_requests(e)
+
+    response = jsonify({'jobId': job_id, 'status': 'queued', 'statusUrl': f'/api/jobs/{job_id}'})
+    response.headers['Location'] = f'/api/jobs/{job_id}'
+    return response, 202
+
+@bp.route('/api/jobs', methods=['POST', 'OPTIONS'])
+def create_subtitles_job():
+    if request.method == 'OPTIONS':
+        return '', 200
+
+    if not subtitles_available:
+        return jsonify({'error': 'Service indisponible'}), 503
+
+    data = request.get_json(silent=True)
+    if not data:
+        return jsonify({'error': 'Corps de requête manquant'}), 400
+
+    if data.get('format', 'txt') not in ('txt', 'srt', 'vtt'):
+        return jsonify({'error': 'Format invalide. Formats acceptés: txt, srt, vtt'}), 400
+
+    return submit_job(data)
+
+@bp.route('/api/jobs/<job_id>', methods=['GET'])
+def get_subtitles_job(job_id):
+    if not subtitles_available:
+        return jsonify({'error': 'Service indisponible'}), 503
+
+    # Long-poll optionnel (?wait=secondes), borné pour rester sous le timeout gunicorn
+    try:
+        wait = min(max(float(request.args.get('wait', 0)), 0), 25)
+    except ValueError:
+        wait = 0
+
+    # Un long-poll occupe un thread : nombre borné par worker, au-delà réponse immédiate
+    admission = get_admission_controller()
+    if wait and admission.enter_long_poll():
+        try:
+            job = wait_for_job(job_id, wait)
+        finally:
+            admission.leave_long_poll()
+    else:
+        job = wait_for_job(job_id, 0)
+    if job is None:
+        return jsonify({'error': 'Job introuvable'}), 404
+    return jsonify(job), 200
+
+@bp.route('/api/jobs/<job_id>/results', methods=['GET'])
+def get_subtitles_job_results(job_id):
+    """Résultats paginés d'un job (?offset=&limit=), séparés du statut."""
+    if not subtitles_available:
+        return jsonify({'error': 'Service indisponible'}), 503
+
+    try:
+        offset = int(request.args.get('offset', 0))
+        limit = int(request.args.get('limit', JOB_RESULTS_PAGE))
+    except ValueError:
+        return jsonify({'error': 'offset et limit doivent être des entiers'}), 400
+
+    results = get_job_results(job_id, offset, limit)
+    if results is None:
+        return jsonify({'error': 'Job introuvable'}), 404
+    return jsonify(results), 200
+
+@bp.route('/api/prefetch', methods=['POST', 'OPTIONS'])
+def prefetch_subtitles():
+    if request.method == 'OPTIONS':
+        return '', 200
+
+    if not subtitles_available:
+        return jsonify({'error': 'Service indisponible'}), 503
+
+    data = request.get_json(silent=True) or {}
+    video_ids = data.get('videoIds') or []
+    language = data.get('language', 'fr')
+
+    if not isinstance(video_ids, list) or not video_ids:
+        return jsonify({'error': 'videoIds manquant'}), 400
+    if not is_valid_language(language):
+        return jsonify({'error': 'Langue invalide'}), 400
+    if len(video_ids) > 100:
+        return jsonify({'error': '100 vidéos maximum par requête'}), 400
+
+    try:
+        queued = enqueue_prefetch(video_ids, language)
+    except QueueFull as e:
+        return too_many_requests(e)
+    return jsonify({'queued': queued, 'queueSize': prefetch_queue_size()}), 202
+
+@bp.route('/api/subtitles/languages/<video_id>', methods=['GET'])
 def get_available_languages_route(video_id):
     try:
         if not subtitles_available:
             return jsonify({'error': 'Service indisponible'}), 503
             
-        languages = get_available_languages(video_id)
+        admission = get_admission_controller()
+        started = admission.acquire()
+        try:
+            languages = extractor().get_available_languages(video_id)
+        finally:
+            admission.release(started)
         return jsonify({
             'videoId': video_id,
             'languages': languages
@@ -103,12 +419,16 @@ def get_available_languages_route(video_id):
     
     except SubtitleError as e:
         return jsonify({'error': str(e)}), 404
+    except (RateLimitTimeout, Overloaded) as e:
+        return rate_limited(e)
     except Exception as e:
         return jsonify({
             'error': 'Erreur lors de la récupération des langues',
             'details': str(e)
         }), 500
 
+app = create_app()
+
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 5000))
     debug = os.getenv('FLASK_ENV') == 'development'
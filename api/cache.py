@@ -0,0 +1,256 @@
+import json
+import os
+import sqlite3
+import time
+
+from storage import connect
+
+
+# ==================== CONFIGURATION ====================
+
+# Durée de validité d'une transcription en cache (secondes)
+TRANSCRIPT_CACHE_TTL = float(os.getenv('TRANSCRIPT_CACHE_TTL', 7 * 24 * 3600))
+
+# Live et premières : rafraîchissement incrémental au plus toutes les LIVE_CACHE_TTL secondes
+LIVE_CACHE_TTL = float(os.getenv('LIVE_CACHE_TTL', 5))
+
+# Durée maximale d'un rafraîchissement réservé (worker tué en cours de route)
+REFRESH_CLAIM_TTL = 30
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS transcripts (
+    video_id TEXT NOT NULL,
+    language TEXT NOT NULL,
+    data TEXT NOT NULL,
+    fetched REAL NOT NULL,
+    expires REAL NOT NULL,
+    PRIMARY KEY (video_id, language)
+);
+CREATE TABLE IF NOT EXISTS live_segments (
+    video_id TEXT NOT NULL,
+    language TEXT NOT NULL,
+    t_start_ms INTEGER NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (video_id, language, t_start_ms)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS refresh_claims (
+    video_id TEXT NOT NULL,
+    language TEXT NOT NULL,
+    until REAL NOT NULL,
+    PRIMARY KEY (video_id, language)
+);
+CREATE TABLE IF NOT EXISTS popularity (
+    video_id TEXT NOT NULL,
+    language TEXT NOT NULL,
+    hits INTEGER NOT NULL,
+    last_requested REAL NOT NULL,
+    PRIMARY KEY (video_id, language)
+);
+'''
+
+
+def _db():
+    return connect('cache', SCHEMA)
+
+
+# ==================== TRANSCRIPTIONS ====================
+
+def get_cached_transcript(video_id, language, allow_stale=False):
+    """
+    Segments parsés d'une vidéo pour la langue demandée, ou None.
+    allow_stale=True retourne aussi une entrée expirée.
+    """
+    try:
+        row = _db().execute(
+            'SELECT data, expires FROM transcripts WHERE video_id = ? AND language = ?',
+            (video_id, language)
+        ).fetchone()
+    except sqlite3.Error as e:
+        print(f"⚠️  Cache indisponible ({e})")
+        return None
+
+    if row is None or (not allow_stale and row['expires'] < time.time()):
+        return None
+    return json.loads(row['data'])
+
+
+def get_cached_entry(video_id, language):
+    """Transcription en cache, même expirée, avec son état : (transcript, expired) ou (None, True)."""
+    try:
+        row = _db().execute(
+            'SELECT data, expires FROM transcripts WHERE video_id = ? AND language = ?',
+            (video_id, language)
+        ).fetchone()
+    except sqlite3.Error as e:
+        print(f"⚠️  Cache indisponible ({e})")
+        return None, True
+
+    if row is None:
+        return None, True
+    return json.loads(row['data']), row['expires'] < time.time()
+
+
+def put_cached_transcript(video_id, language, transcript, ttl=None):
+    """
+    Enregistre une transcription (dict retourné par fetch_transcript).
+    Live : les segments vont dans live_segments (seuls les nouveaux tStartMs sont
+    insérés) et l'entrée ne garde que les métadonnées, avec 'count' et 'lastMs'.
+    Retourne l'entrée enregistrée (la transcription telle quelle si SQLite échoue).
+    """
+    now = time.time()
+    live = transcript.get('live')
+    if ttl is None:
+        ttl = LIVE_CACHE_TTL if live else TRANSCRIPT_CACHE_TTL
+    conn = _db()
+    try:
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            if live:
+                entry = _store_live_segments(conn, video_id, language, transcript)
+            else:
+                # Live terminé : la transcription complète remplace les lignes
+                conn.execute('DELETE FROM live_segments WHERE video_id = ? AND language = ?',
+                             (video_id, language))
+                entry = transcript
+            conn.execute(
+                'INSERT OR REPLACE INTO transcripts (video_id, language, data, fetched, expires) '
+                'VALUES (?, ?, ?, ?, ?)',
+                (video_id, language, json.dumps(entry, ensure_ascii=False), now, now + ttl)
+            )
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+    except sqlite3.Error as e:
+        print(f"⚠️  Écriture cache impossible ({e})")
+        return transcript
+    return entry
+
+
+def _store_live_segments(conn, video_id, language, transcript):
+    """Insère les segments inconnus d'un live et retourne ses métadonnées à jour."""
+    segments = transcript.get('segments', [])
+    before = conn.total_changes
+    conn.executemany(
+        'INSERT OR IGNORE INTO live_segments (video_id, language, t_start_ms, data) VALUES (?, ?, ?, ?)',
+        [(video_id, language, segment_ms(seg), json.dumps(seg, ensure_ascii=False)) for seg in segments]
+    )
+    added = conn.total_changes - before
+
+    row = conn.execute(
+        'SELECT data FROM transcripts WHERE video_id = ? AND language = ?', (video_id, language)
+    ).fetchone()
+    previous = json.loads(row['data']) if row is not None else {}
+    if 'count' in previous:
+        count, last_ms = previous['count'] + added, previous['lastMs']
+    else:
+        # Pas encore de métadonnées (première écriture) : comptage unique
+        row = conn.execute(
+            'SELECT COUNT(*) AS count, MAX(t_start_ms) AS last_ms FROM live_segments '
+            'WHERE video_id = ? AND language = ?', (video_id, language)
+        ).fetchone()
+        count, last_ms = row['count'], row['last_ms']
+    starts = [segment_ms(seg) for seg in segments]
+    if last_ms is not None:
+        starts.append(last_ms)
+
+    entry = {k: v for k, v in transcript.items() if k != 'segments'}
+    entry.update({'count': count, 'lastMs': max(starts) if starts else None})
+    return entry
+
+
+def get_live_segments(video_id, language, after_ms=None):
+    """Segments d'un live triés par début, après after_ms (tStartMs exclu) si fourni."""
+    try:
+        rows = _db().execute(
+            'SELECT data FROM live_segments WHERE video_id = ? AND language = ? AND t_start_ms > ? '
+            'ORDER BY t_start_ms',
+            (video_id, language, -1 if after_ms is None else after_ms)
+        ).fetchall()
+    except sqlite3.Error as e:
+        print(f"⚠️  Cache indisponible ({e})")
+        return []
+    return [json.loads(row['data']) for row in rows]
+
+
+def segment_ms(segment):
+    """Début d'un segment en millisecondes (équivalent du tStartMs de YouTube)."""
+    return int(round(segment['start'] * 1000))
+
+
+def is_cached(video_id, language, min_remaining=0):
+    """Vrai si la transcription est en cache et valide encore min_remaining secondes."""
+    try:
+        row = _db().execute(
+            'SELECT expires FROM transcripts WHERE video_id = ? AND language = ?',
+            (video_id, language)
+        ).fetchone()
+    except sqlite3.Error:
+        return False
+    return row is not None and row['expires'] > time.time() + min_remaining
+
+
+def claim_refresh(video_id, language, ttl=REFRESH_CLAIM_TTL):
+    """
+    Réserve le rafraîchissement d'une transcription (un seul à la fois, tous workers
+    confondus). Faux si un autre poll s'en charge déjà.
+    """
+    conn = _db()
+    now = time.time()
+    try:
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute(
+                'SELECT until FROM refresh_claims WHERE video_id = ? AND language = ?',
+                (video_id, language)
+            ).fetchone()
+            claimed = row is None or row['until'] < now
+            if claimed:
+                conn.execute(
+                    'INSERT OR REPLACE INTO refresh_claims (video_id, language, until) VALUES (?, ?, ?)',
+                    (video_id, language, now + ttl)
+                )
+            conn.execute('COMMIT')
+            return claimed
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+    except sqlite3.Error as e:
+        print(f"⚠️  Réservation du rafraîchissement impossible ({e})")
+        return True
+
+
+def release_refresh(video_id, language):
+    try:
+        _db().execute('DELETE FROM refresh_claims WHERE video_id = ? AND language = ?',
+                      (video_id, language))
+    except sqlite3.Error:
+        pass
+
+
+# ==================== POPULARITÉ ====================
+
+def record_request(video_id, language):
+    """Compte une demande de sous-titres (pour le préchargement des vidéos populaires)."""
+    try:
+        _db().execute(
+            'INSERT INTO popularity (video_id, language, hits, last_requested) VALUES (?, ?, 1, ?) '
+            'ON CONFLICT (video_id, language) DO UPDATE SET hits = hits + 1, '
+            'last_requested = excluded.last_requested',
+            (video_id, language, time.time())
+        )
+    except sqlite3.Error as e:
+        print(f"⚠️  Statistiques de popularité indisponibles ({e})")
+
+
+def most_requested(limit=50, since=7 * 24 * 3600):
+    """Couples (video_id, language) les plus demandés sur la période."""
+    try:
+        rows = _db().execute(
+            'SELECT video_id, language FROM popularity WHERE last_requested > ? '
+            'ORDER BY hits DESC LIMIT ?',
+            (time.time() - since, limit)
+        ).fetchall()
+    except sqlite3.Error:
+        return []
+    return [(row['video_id'], row['language']) for row in rows]
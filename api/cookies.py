@@ -0,0 +1,221 @@
+import glob
+import os
+import tempfile
+import threading
+import time
+
+
+# ==================== CONFIGURATION ====================
+
+# Durée de mise à l'écart d'un compte après un blocage anti-bot (secondes)
+COOKIE_COOLDOWN = float(os.getenv('COOKIE_COOLDOWN', 900))
+
+# Dossier optionnel contenant plusieurs fichiers cookies (un par compte).
+# Pas de valeur par défaut : il doit rester hors des fichiers servis par l'application.
+COOKIES_DIR = os.getenv('COOKIES_DIR')
+
+LATENCY_ALPHA = 0.3
+
+
+# ==================== ÉTAT D'UN COMPTE ====================
+
+class CookieJar:
+    """
+    Un fichier cookies (un compte YouTube) avec ses stats.
+    Le budget de requêtes par compte est le seau 'cookies:' de ratelimit.py,
+    partagé entre les workers.
+    """
+
+    def __init__(self, name, path):
+        self.name = name
+        self.path = path
+        self.last_used = 0.0
+        self.previous_used = 0.0
+        self.cooldown_until = 0.0
+        self.latency = None
+        self.in_flight = 0
+        self.successes = 0
+        self.failures = 0
+        self.blocks = 0
+
+    def is_available(self, now):
+        return now >= self.cooldown_until
+
+    def to_dict(self, now):
+        total = self.successes + self.failures
+        return {
+            'jar': self.name,
+            'successes': self.successes,
+            'failures': self.failures,
+            'blocks': self.blocks,
+            'successRate': round(self.successes / total, 3) if total else None,
+            'latencyMs': round(self.latency * 1000) if self.latency is not None else None,
+            'inFlight': self.in_flight,
+            'lastUsed': round(now - self.last_used) if self.last_used else None,
+            'cooldownRemaining': max(0, round(self.cooldown_until - now)),
+        }
+
+
+# ==================== POOL ====================
+
+class CookiePool:
+    """
+    Pool de comptes cookies avec rotation LRU.
+    - acquire() : compte sain le moins récemment utilisé
+    - release(path, ...) : remonte le résultat (succès, échec, blocage)
+    - cancel(path) : rend un compte qui n'a finalement pas servi
+    """
+
+    def __init__(self, jars, cooldown=COOKIE_COOLDOWN):
+        self.jars = jars
+        self.cooldown = cooldown
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.jars)
+
+    def _find(self, path):
+        for jar in self.jars:
+            if jar.path == path:
+                return jar
+        return None
+
+    def acquire(self):
+        """
+        Retourne le chemin du fichier cookies à utiliser, ou None si le pool est vide.
+        Jamais de requête sans cookies quand des comptes existent : si tous sont
+        en cooldown, on prend celui qui en sortira le plus tôt.
+        """
+        if not self.jars:
+            return None
+
+        now = time.time()
+        with self._lock:
+            candidates = [j for j in self.jars if j.is_available(now)]
+            if not candidates:
+                candidates = [min(self.jars, key=lambda j: j.cooldown_until)]
+                print(f"⚠️  Tous les comptes cookies sont en cooldown, repli sur {candidates[0].name}")
+
+            jar = min(candidates, key=lambda j: j.last_used)
+            jar.previous_used = jar.last_used
+            jar.last_used = now
+            jar.in_flight += 1
+            return jar.path
+
+    def cancel(self, path):
+        """Compte réservé mais pas utilisé (limite de débit locale) : rotation LRU inchangée."""
+        if not path:
+            return
+        with self._lock:
+            jar = self._find(path)
+            if jar is None:
+                return
+            jar.in_flight = max(0, jar.in_flight - 1)
+            jar.last_used = jar.previous_used
+
+    def release(self, path, success=True, latency=None, blocked=False):
+        """
+        Met à jour les stats du compte après une requête.
+        success=None : échec sans rapport avec le compte, non comptabilisé.
+        """
+        if not path:
+            return
+        with self._lock:
+            jar = self._find(path)
+            if jar is None:
+                return
+
+            jar.in_flight = max(0, jar.in_flight - 1)
+
+            if latency is not None:
+                if jar.latency is None:
+                    jar.latency = latency
+                else:
+                    jar.latency += LATENCY_ALPHA * (latency - jar.latency)
+
+            if blocked:
+                jar.blocks += 1
+                jar.failures += 1
+                jar.cooldown_until = time.time() + self.cooldown
+                print(f"🚫 Compte cookies {jar.name} bloqué, cooldown {int(self.cooldown)}s")
+            elif success:
+                jar.successes += 1
+            elif success is not None:
+                jar.failures += 1
+
+    def name_of(self, path):
+        jar = self._find(path)
+        return jar.name if jar else None
+
+    def stats(self):
+        now = time.time()
+        with self._lock:
+            return {
+                'count': len(self.jars),
+                'available': sum(1 for j in self.jars if j.is_available(now)),
+                'jars': [j.to_dict(now) for j in self.jars],
+            }
+
+
+# ==================== CHARGEMENT ====================
+
+def _write_temp_cookies(content):
+    with tempfile.NamedTemporaryFile(mode='w', suffix='.txt', delete=False) as f:
+        f.write(content)
+        return f.name
+
+
+def load_cookie_jars():
+    """
+    Charge tous les comptes cookies une seule fois :
+    - YOUTUBE_COOKIES, YOUTUBE_COOKIES_1, YOUTUBE_COOKIES_2, ... (contenu Netscape)
+    - COOKIES_DIR/*.txt (un fichier par compte)
+    - cookies.txt (compatibilité)
+    """
+    jars = []
+    seen = set()
+
+    env_names = ['YOUTUBE_COOKIES'] + sorted(
+        (k for k in os.environ if k.startswith('YOUTUBE_COOKIES_') and k[16:].isdigit()),
+        key=lambda k: int(k[16:])
+    )
+    for env_name in env_names:
+        content = os.getenv(env_name)
+        if not content:
+            continue
+        try:
+            path = _write_temp_cookies(content)
+            jars.append(CookieJar(env_name.lower(), path))
+            print(f"✅ Cookies chargés depuis {env_name}: {path}")
+        except Exception as e:
+            print(f"❌ Erreur création fichier cookies ({env_name}): {e}")
+
+    candidates = sorted(glob.glob(os.path.join(COOKIES_DIR, '*.txt'))) if COOKIES_DIR else []
+    candidates += ['cookies.txt', os.path.join(os.path.dirname(__file__), 'cookies.txt')]
+    for candidate in candidates:
+        if not os.path.exists(candidate):
+            continue
+        real = os.path.realpath(candidate)
+        if real in seen:
+            continue
+        seen.add(real)
+        jars.append(CookieJar(os.path.splitext(os.path.basename(candidate))[0], candidate))
+        print(f"✅ Cookies trouvés: {candidate}")
+
+    return jars
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_cookie_pool():
+    """Pool partagé par le processus, chargé au premier appel."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = CookiePool(load_cookie_jars())
+                if len(_pool):
+                    print(f"✅ {len(_pool)} compte(s) cookies dans le pool")
+    return _pool
@@ -0,0 +1,3 @@
+class SubtitleError(Exception):
+    """Exception personnalisée pour les erreurs de sous-titres"""
+    pass
@@ -0,0 +1,82 @@
+import gzip
+import hashlib
+import json
+import os
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+# ==================== CONFIGURATION ====================
+
+# Cache HTTP des réponses de sous-titres (navigateur, service worker, CDN)
+SUBTITLES_MAX_AGE = int(os.getenv('SUBTITLES_MAX_AGE', 300))
+SUBTITLES_STALE_WHILE_REVALIDATE = int(os.getenv('SUBTITLES_STALE_WHILE_REVALIDATE', 86400))
+
+# En dessous de cette taille, la compression ne vaut pas le coût CPU
+COMPRESS_MIN_SIZE = 1024
+
+COMPRESSIBLE_MIMETYPES = ('application/json', 'text/plain', 'text/html', 'text/css',
+                          'application/javascript', 'text/javascript', 'application/manifest+json')
+
+
+def subtitles_cache_control():
+    return (f'public, max-age={SUBTITLES_MAX_AGE}, '
+            f'stale-while-revalidate={SUBTITLES_STALE_WHILE_REVALIDATE}')
+
+
+def content_etag(result):
+    """ETag basé sur le contenu (hors champs techniques comme 'method' ou 'stale')."""
+    payload = {k: v for k, v in result.items() if k not in ('method', 'stale')}
+    body = json.dumps(payload, sort_keys=True, ensure_ascii=False).encode('utf-8')
+    return hashlib.sha256(body).hexdigest()[:32]
+
+
+# ==================== COMPRESSION ====================
+
+def available_encodings():
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def negotiate_encoding(accept_encodings, offered=None):
+    """Meilleur encodage accepté par le client parmi ceux proposés ('br', 'gzip') ou None."""
+    for encoding in offered or available_encodings():
+        if accept_encodings[encoding]:
+            return encoding
+    return None
+
+
+def compress(data, encoding):
+    if encoding == 'br':
+        return brotli.compress(data, quality=5)
+    return gzip.compress(data, compresslevel=6)
+
+
+def compress_response(request, response):
+    """Compresse une réponse dynamique si le client l'accepte (after_request)."""
+    response.vary.add('Accept-Encoding')
+
+    if (response.status_code != 200 or response.direct_passthrough
+            or 'Content-Encoding' in response.headers
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+        return response
+
+    data = response.get_data()
+    if len(data) < COMPRESS_MIN_SIZE:
+        return response
+
+    encoding = negotiate_encoding(request.accept_encodings)
+    if encoding is None:
+        return response
+
+    response.set_data(compress(data, encoding))
+    response.headers['Content-Encoding'] = encoding
+
+    # Même contenu, autre représentation : l'ETag devient faible (comme nginx)
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+
+    return response
@@ -0,0 +1,448 @@
+"""
+Jobs asynchrones pour les extractions longues ou en masse (playlists, listes de vidéos).
+Les jobs et leurs parties sont stockés dans SQLite : une partie terminée survit
+au redémarrage du worker et n'est jamais retéléchargée.
+
+Usage :
+    python api/jobs.py worker      # pool de JOBS_CONCURRENCY threads
+"""
+
+import json
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+import uuid
+
+sys.path.append(os.path.dirname(__file__))
+
+from storage import connect
+
+
+# ==================== CONFIGURATION ====================
+
+JOBS_CONCURRENCY = int(os.getenv('JOBS_CONCURRENCY', 2))
+
+# Une partie 'running' sans nouvelles depuis ce délai est reprise (worker redémarré)
+JOB_PART_TIMEOUT = float(os.getenv('JOB_PART_TIMEOUT', 600))
+
+# Durée de conservation des jobs terminés (secondes)
+JOBS_RETENTION = float(os.getenv('JOBS_RETENTION', 7 * 24 * 3600))
+
+MAX_VIDEOS_PER_JOB = int(os.getenv('MAX_VIDEOS_PER_JOB', 500))
+
+# Vidéos en attente ou en cours, tous jobs confondus, au-delà desquelles les
+# nouveaux jobs sont refusés (une playlist non encore lue compte pour MAX_VIDEOS_PER_JOB)
+JOBS_MAX_PENDING = int(os.getenv('JOBS_MAX_PENDING', 2000))
+
+# Durée moyenne estimée d'une partie (secondes), pour Retry-After
+JOB_PART_ESTIMATE = 10
+
+# Taille des pages de GET /api/jobs/<id>/results (par défaut et maximum)
+JOB_RESULTS_PAGE = 20
+JOB_RESULTS_MAX_PAGE = 100
+
+FINISHED = ('done', 'failed')
+
+PLAYLIST_ID_PATTERN = re.compile(r'^[A-Za-z0-9_-]{2,64}$')
+
+# Options du mode synchrone que les jobs ne gèrent pas (rejetées plutôt qu'ignorées)
+UNSUPPORTED_FIELDS = ('languages', 'bilingual', 'since', 'cursor')
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    params TEXT NOT NULL,
+    total INTEGER,
+    done INTEGER NOT NULL DEFAULT 0,
+    failed INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    created REAL NOT NULL,
+    updated REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS job_parts (
+    job_id TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    video_id TEXT NOT NULL,
+    status TEXT NOT NULL,
+    result TEXT,
+    error TEXT,
+    heartbeat REAL,
+    PRIMARY KEY (job_id, idx)
+);
+CREATE INDEX IF NOT EXISTS job_parts_status ON job_parts (status, heartbeat);
+'''
+
+
+class JobError(Exception):
+    """Paramètres de job invalides"""
+    pass
+
+
+class JobQueueFull(Exception):
+    """Trop de vidéos en attente dans les jobs"""
+
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def _db():
+    return connect('jobs', SCHEMA)
+
+
+def _transaction(conn):
+    conn.execute('BEGIN IMMEDIATE')
+
+
+# ==================== CRÉATION / LECTURE ====================
+
+def create_job(params):
+    """
+    Crée un job à partir de 'videoId', 'videoIds' ou 'playlistId'
+    (plus 'format' et 'language'). Retourne l'ID du job.
+    """
+    from prefetch import is_valid_language, is_valid_video_id
+
+    video_ids = params.get('videoIds') or ([params['videoId']] if params.get('videoId') else [])
+    playlist_id = params.get('playlistId')
+
+    unsupported = [field for field in UNSUPPORTED_FIELDS if params.get(field) not in (None, False, '')]
+    if unsupported:
+        raise JobError(f'Non supporté en mode asynchrone : {", ".join(unsupported)}')
+
+    if not video_ids and not playlist_id:
+        raise JobError('videoId, videoIds ou playlistId manquant')
+    if not isinstance(video_ids, list) or not all(is_valid_video_id(v) for v in video_ids):
+        raise JobError('videoIds invalide')
+    if len(video_ids) > MAX_VIDEOS_PER_JOB:
+        raise JobError(f'{MAX_VIDEOS_PER_JOB} vidéos maximum par job')
+    if not video_ids and not (isinstance(playlist_id, str) and PLAYLIST_ID_PATTERN.match(playlist_id)):
+        raise JobError('playlistId invalide')
+    if not is_valid_language(params.get('language', 'fr')):
+        raise JobError('Langue invalide')
+    if params.get('format', 'txt') not in ('txt', 'srt', 'vtt'):
+        raise JobError('Format invalide. Formats acceptés: txt, srt, vtt')
+
+    job_params = {
+        'format': params.get('format', 'txt'),
+        'language': params.get('language', 'fr'),
+        'playlistId': playlist_id if not video_ids else None,
+    }
+
+    job_id = uuid.uuid4().hex
+    now = time.time()
+    conn = _db()
+    _transaction(conn)
+    try:
+        pending = _pending_parts(conn)
+        size = len(video_ids) if video_ids else MAX_VIDEOS_PER_JOB
+        if pending + size > JOBS_MAX_PENDING:
+            retry_after = min(3600, max(60, int(pending * JOB_PART_ESTIMATE / max(1, JOBS_CONCURRENCY))))
+            raise JobQueueFull('Trop de jobs en attente, réessayez plus tard', retry_after)
+
+        conn.execute(
+            'INSERT INTO jobs (id, status, params, total, created, updated) VALUES (?, ?, ?, ?, ?, ?)',
+            (job_id, 'queued', json.dumps(job_params), len(video_ids) if video_ids else None, now, now)
+        )
+        _insert_parts(conn, job_id, video_ids)
+        conn.execute('COMMIT')
+    except BaseException:
+        conn.execute('ROLLBACK')
+        raise
+    return job_id
+
+
+def _pending_parts(conn):
+    """Vidéos restant à traiter, playlists non lues comprises (estimation haute)."""
+    parts = conn.execute(
+        "SELECT COUNT(*) FROM job_parts WHERE status IN ('queued', 'running')"
+    ).fetchone()[0]
+    playlists = conn.execute(
+        "SELECT COUNT(*) FROM jobs WHERE total IS NULL AND status NOT IN ('done', 'failed')"
+    ).fetchone()[0]
+    return parts + playlists * MAX_VIDEOS_PER_JOB
+
+
+def _insert_parts(conn, job_id, video_ids):
+    conn.executemany(
+        'INSERT INTO job_parts (job_id, idx, video_id, status) VALUES (?, ?, ?, ?)',
+        [(job_id, i, video_id, 'queued') for i, video_id in enumerate(video_ids)]
+    )
+
+
+def get_job(job_id):
+    """
+    État et progression d'un job, ou None. Sans les résultats (voir get_job_results) :
+    un poll reste léger même pour une playlist de plusieurs centaines de vidéos.
+    """
+    job = _db().execute(
+        'SELECT id, status, params, total, done, failed, error, created, updated FROM jobs WHERE id = ?',
+        (job_id,)
+    ).fetchone()
+    if job is None:
+        return None
+
+    total = job['total']
+    finished = job['done'] + job['failed']
+    return {
+        'jobId': job['id'],
+        'status': job['status'],
+        'progress': {
+            'total': total,
+            'done': job['done'],
+            'failed': job['failed'],
+            'percent': round(100 * finished / total) if total else 0,
+        },
+        'params': json.loads(job['params']),
+        'error': job['error'],
+        'resultsUrl': f"/api/jobs/{job['id']}/results",
+        'created': job['created'],
+        'updated': job['updated'],
+    }
+
+
+def get_job_results(job_id, offset=0, limit=JOB_RESULTS_PAGE):
+    """
+    Parties terminées d'un job (succès et échecs), par ordre d'index, page par page.
+    Retourne None si le job n'existe pas.
+    """
+    conn = _db()
+    if conn.execute('SELECT 1 FROM jobs WHERE id = ?', (job_id,)).fetchone() is None:
+        return None
+
+    limit = min(max(limit, 1), JOB_RESULTS_MAX_PAGE)
+    offset = max(offset, 0)
+    parts = conn.execute(
+        'SELECT idx, video_id, status, result, error FROM job_parts '
+        "WHERE job_id = ? AND status IN ('done', 'failed') ORDER BY idx LIMIT ? OFFSET ?",
+        (job_id, limit + 1, offset)
+    ).fetchall()
+
+    items = []
+    for p in parts[:limit]:
+        item = {'index': p['idx'], 'videoId': p['video_id'], 'status': p['status']}
+        if p['status'] == 'done':
+            item['result'] = json.loads(p['result'])
+        else:
+            item['error'] = p['error']
+        items.append(item)
+
+    return {
+        'jobId': job_id,
+        'offset': offset,
+        'limit': limit,
+        'results': items,
+        'nextOffset': offset + limit if len(parts) > limit else None,
+    }
+
+
+def wait_for_job(job_id, timeout):
+    """Long-poll : attend un changement de progression ou la fin du job."""
+    job = get_job(job_id)
+    if job is None or job['status'] in FINISHED or timeout <= 0:
+        return job
+
+    deadline = time.time() + timeout
+    updated = job['updated']
+    while time.time() < deadline:
+        time.sleep(0.5)
+        row = _db().execute('SELECT updated FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        if row is None or row['updated'] != updated:
+            break
+    return get_job(job_id)
+
+
+# ==================== WORKER ====================
+
+def _touch_job(conn, job_id, now):
+    """Recalcule la progression et termine le job si toutes ses parties sont finies."""
+    counts = dict(conn.execute(
+        'SELECT status, COUNT(*) FROM job_parts WHERE job_id = ? GROUP BY status', (job_id,)
+    ).fetchall())
+    done, failed = counts.get('done', 0), counts.get('failed', 0)
+    total = sum(counts.values())
+    pending = total - done - failed
+
+    if pending:
+        status = 'running'
+    else:
+        status = 'done' if done or not total else 'failed'
+
+    conn.execute(
+        'UPDATE jobs SET status = ?, total = ?, done = ?, failed = ?, updated = ? WHERE id = ?',
+        (status, total, done, failed, now, job_id)
+    )
+
+
+def _claim_playlist():
+    """Réserve un job playlist pas encore découpé en parties."""
+    conn = _db()
+    _transaction(conn)
+    try:
+        now = time.time()
+        row = conn.execute(
+            "SELECT id, params FROM jobs WHERE total IS NULL AND "
+            "(status = 'queued' OR (status = 'expanding' AND updated < ?)) "
+            "ORDER BY created LIMIT 1",
+            (now - JOB_PART_TIMEOUT,)
+        ).fetchone()
+        if row is not None:
+            conn.execute("UPDATE jobs SET status = 'expanding', updated = ? WHERE id = ?", (now, row['id']))
+        conn.execute('COMMIT')
+        return row
+    except BaseException:
+        conn.execute('ROLLBACK')
+        raise
+
+
+def _claim_part():
+    """Réserve la prochaine partie à traiter (ou une partie abandonnée par un worker mort)."""
+    conn = _db()
+    _transaction(conn)
+    try:
+        now = time.time()
+        row = conn.execute(
+            "SELECT p.job_id, p.idx, p.video_id, j.params FROM job_parts p "
+            "JOIN jobs j ON j.id = p.job_id "
+            "WHERE p.status = 'queued' OR (p.status = 'running' AND p.heartbeat < ?) "
+            "ORDER BY j.created, p.idx LIMIT 1",
+            (now - JOB_PART_TIMEOUT,)
+        ).fetchone()
+        if row is not None:
+            conn.execute(
+                "UPDATE job_parts SET status = 'running', heartbeat = ? WHERE job_id = ? AND idx = ?",
+                (now, row['job_id'], row['idx'])
+            )
+            conn.execute("UPDATE jobs SET status = 'running', updated = ? WHERE id = ?",
+                         (now, row['job_id']))
+        conn.execute('COMMIT')
+        return row
+    except BaseException:
+        conn.execute('ROLLBACK')
+        raise
+
+
+def _finish_part(job_id, idx, status, result=None, error=None):
+    conn = _db()
+    _transaction(conn)
+    try:
+        now = time.time()
+        conn.execute(
+            'UPDATE job_parts SET status = ?, result = ?, error = ?, heartbeat = ? '
+            'WHERE job_id = ? AND idx = ?',
+            (status, json.dumps(result, ensure_ascii=False) if result is not None else None,
+             error, now, job_id, idx)
+        )
+        _touch_job(conn, job_id, now)
+        conn.execute('COMMIT')
+    except BaseException:
+        conn.execute('ROLLBACK')
+        raise
+
+
+def expand_playlist(job):
+    """Découpe un job playlist en une partie par vidéo."""
+    from ratelimit import RateLimitTimeout
+    from subtitles import SubtitleError, list_playlist_videos
+
+    params = json.loads(job['params'])
+    conn = _db()
+    try:
+        video_ids = list_playlist_videos(params['playlistId'])[:MAX_VIDEOS_PER_JOB]
+    except RateLimitTimeout:
+        conn.execute("UPDATE jobs SET status = 'queued', updated = ? WHERE id = ?", (time.time(), job['id']))
+        time.sleep(5)
+        return
+    except SubtitleError as e:
+        conn.execute("UPDATE jobs SET status = 'failed', total = 0, error = ?, updated = ? WHERE id = ?",
+                     (str(e), time.time(), job['id']))
+        print(f"❌ Playlist {params['playlistId']}: {e}")
+        return
+
+    _transaction(conn)
+    try:
+        _insert_parts(conn, job['id'], video_ids)
+        _touch_job(conn, job['id'], time.time())
+        conn.execute('COMMIT')
+    except BaseException:
+        conn.execute('ROLLBACK')
+        raise
+    print(f"📋 Playlist {params['playlistId']}: {len(video_ids)} vidéo(s)")
+
+
+def process_part(part):
+    """Extrait les sous-titres d'une partie (en priorité batch, via le cache)."""
+    from ratelimit import PRIORITY_BATCH, RateLimitTimeout
+    from subtitles import SubtitleError, get_subtitles
+
+    params = json.loads(part['params'])
+    try:
+        result = get_subtitles(part['video_id'], params['format'], params['language'], PRIORITY_BATCH)
+        _finish_part(part['job_id'], part['idx'], 'done', result=result)
+    except RateLimitTimeout:
+        # La partie repart dans la file sans être comptée en échec
+        _finish_part(part['job_id'], part['idx'], 'queued')
+        time.sleep(5)
+    except SubtitleError as e:
+        _finish_part(part['job_id'], part['idx'], 'failed', error=str(e))
+
+
+def purge_old_jobs():
+    conn = _db()
+    limit = time.time() - JOBS_RETENTION
+    _transaction(conn)
+    try:
+        conn.execute('DELETE FROM job_parts WHERE job_id IN (SELECT id FROM jobs WHERE updated < ?)', (limit,))
+        conn.execute('DELETE FROM jobs WHERE updated < ?', (limit,))
+        conn.execute('COMMIT')
+    except BaseException:
+        conn.execute('ROLLBACK')
+        raise
+
+
+def _worker_loop(name):
+    while True:
+        try:
+            playlist = _claim_playlist()
+            if playlist is not None:
+                expand_playlist(playlist)
+                continue
+
+            part = _claim_part()
+            if part is None:
+                time.sleep(1)
+                continue
+
+            print(f"⚙️  [{name}] Job {part['job_id'][:8]} partie {part['idx']} ({part['video_id']})")
+            process_part(part)
+        except sqlite3.Error as e:
+            print(f"⚠️  [{name}] Base des jobs indisponible ({e})")
+            time.sleep(5)
+        except Exception as e:
+            print(f"🔥 [{name}] Erreur inattendue: {type(e).__name__} - {e}")
+            time.sleep(5)
+
+
+def run_pool(concurrency=JOBS_CONCURRENCY):
+    """Lance le pool de workers et purge régulièrement les vieux jobs."""
+    print(f"🚀 Pool de jobs démarré ({concurrency} worker(s))")
+    for i in range(concurrency):
+        threading.Thread(target=_worker_loop, args=(f'worker-{i}',), daemon=True).start()
+
+    while True:
+        try:
+            purge_old_jobs()
+        except sqlite3.Error as e:
+            print(f"⚠️  Purge des jobs impossible ({e})")
+        time.sleep(3600)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2 or sys.argv[1] != 'worker':
+        print(__doc__)
+        sys.exit(1)
+    run_pool()
@@ -0,0 +1,240 @@
+"""
+Worker de préchargement : extrait et parse les sous-titres à l'avance
+pour remplir le cache partagé (cache.py).
+
+Usage :
+    python api/prefetch.py worker               # boucle de traitement
+    python api/prefetch.py add ID [ID ...]      # ajoute des vidéos à la file
+    python api/prefetch.py file liste.txt       # un ID (et une langue optionnelle) par ligne
+"""
+
+import os
+import re
+import sqlite3
+import sys
+import time
+
+sys.path.append(os.path.dirname(__file__))
+
+from storage import connect
+
+
+# ==================== CONFIGURATION ====================
+
+# Nombre maximal de vidéos préchargées par minute
+PREFETCH_RATE = float(os.getenv('PREFETCH_RATE', 6))
+
+# Ajout automatique des vidéos les plus demandées (0 pour désactiver)
+PREFETCH_POPULAR_LIMIT = int(os.getenv('PREFETCH_POPULAR_LIMIT', 50))
+PREFETCH_POPULAR_INTERVAL = float(os.getenv('PREFETCH_POPULAR_INTERVAL', 3600))
+
+# Une entrée du cache est rafraîchie si elle expire dans moins de ce délai
+PREFETCH_REFRESH_BEFORE = float(os.getenv('PREFETCH_REFRESH_BEFORE', 24 * 3600))
+
+# Entrées ajoutées par l'API publique (POST /api/prefetch) en attente au maximum ;
+# les vidéos populaires et la CLI ne sont pas concernées
+PREFETCH_MAX_QUEUE = int(os.getenv('PREFETCH_MAX_QUEUE', 500))
+
+MAX_ATTEMPTS = 3
+
+VIDEO_ID_PATTERN = re.compile(r'^[A-Za-z0-9_-]{11}$')
+LANGUAGE_PATTERN = re.compile(r'^[A-Za-z0-9_-]{1,20}$')
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS prefetch_queue (
+    video_id TEXT NOT NULL,
+    language TEXT NOT NULL,
+    source TEXT NOT NULL,
+    enqueued REAL NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (video_id, language)
+);
+'''
+
+
+class QueueFull(Exception):
+    """La file de préchargement publique est pleine."""
+
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def _db():
+    return connect('prefetch', SCHEMA)
+
+
+def is_valid_video_id(video_id):
+    return isinstance(video_id, str) and bool(VIDEO_ID_PATTERN.match(video_id))
+
+
+def is_valid_language(language):
+    """Code langue YouTube ('fr', 'en-US', 'zh-Hans'...)."""
+    return isinstance(language, str) and bool(LANGUAGE_PATTERN.match(language))
+
+
+# ==================== FILE D'ATTENTE ====================
+
+def enqueue(video_ids, language='fr', source='api'):
+    """
+    Ajoute des vidéos à la file. Retourne le nombre d'entrées ajoutées.
+    Source 'api' : au plus PREFETCH_MAX_QUEUE entrées en attente, QueueFull si la file est pleine.
+    """
+    from cache import is_cached
+
+    added = 0
+    now = time.time()
+    conn = _db()
+    if not is_valid_language(language):
+        return 0
+
+    capacity = None
+    if source == 'api':
+        pending = conn.execute(
+            'SELECT COUNT(*) FROM prefetch_queue WHERE source = ?', ('api',)
+        ).fetchone()[0]
+        capacity = PREFETCH_MAX_QUEUE - pending
+        if capacity <= 0:
+            minutes = pending / PREFETCH_RATE if PREFETCH_RATE > 0 else 60
+            raise QueueFull('File de préchargement pleine, réessayez plus tard',
+                            retry_after=max(1, int(minutes * 60)))
+
+    for video_id in video_ids:
+        if capacity is not None and added >= capacity:
+            break
+        if not is_valid_video_id(video_id):
+            continue
+        if is_cached(video_id, language, PREFETCH_REFRESH_BEFORE):
+            continue
+        cursor = conn.execute(
+            'INSERT OR IGNORE INTO prefetch_queue (video_id, language, source, enqueued) '
+            'VALUES (?, ?, ?, ?)',
+            (video_id, language, source, now)
+        )
+        added += cursor.rowcount
+    return added
+
+
+def enqueue_file(path, language='fr'):
+    """Ajoute les vidéos d'un fichier : 'ID' ou 'ID langue' par ligne."""
+    added = 0
+    with open(path) as f:
+        for line in f:
+            parts = line.split('#', 1)[0].split()
+            if parts:
+                added += enqueue([parts[0]], parts[1] if len(parts) > 1 else language, 'file')
+    return added
+
+
+def enqueue_popular(limit=PREFETCH_POPULAR_LIMIT):
+    """Ajoute les vidéos les plus demandées dont le cache manque ou expire bientôt."""
+    from cache import most_requested
+
+    added = 0
+    for video_id, language in most_requested(limit):
+        added += enqueue([video_id], language, 'popular')
+    return added
+
+
+def queue_size():
+    try:
+        return _db().execute('SELECT COUNT(*) FROM prefetch_queue').fetchone()[0]
+    except sqlite3.Error:
+        return None
+
+
+def _next_job():
+    return _db().execute(
+        'SELECT video_id, language, attempts FROM prefetch_queue '
+        "ORDER BY attempts, source = 'popular' DESC, enqueued LIMIT 1"
+    ).fetchone()
+
+
+# ==================== WORKER ====================
+
+def prefetch_one(video_id, language):
+    """Extraction et parsing en priorité batch, puis mise en cache."""
+    from cache import put_cached_transcript
+    from ratelimit import PRIORITY_BATCH
+    from subtitles import fetch_transcript
+
+    transcript = fetch_transcript(video_id, language, PRIORITY_BATCH)
+    put_cached_transcript(video_id, language, transcript)
+    return transcript
+
+
+def run_worker():
+    """Boucle de préchargement, limitée à PREFETCH_RATE vidéos par minute."""
+    interval = 60.0 / PREFETCH_RATE if PREFETCH_RATE > 0 else 60.0
+    next_popular = 0.0
+    print(f"🚀 Worker de préchargement démarré ({PREFETCH_RATE:g} vidéos/min)")
+
+    while True:
+        started = time.time()
+        try:
+            if PREFETCH_POPULAR_LIMIT and started >= next_popular:
+                added = enqueue_popular()
+                if added:
+                    print(f"📈 {added} vidéo(s) populaire(s) ajoutée(s) à la file")
+                next_popular = started + PREFETCH_POPULAR_INTERVAL
+
+            job = _next_job()
+            if job is None:
+                time.sleep(interval)
+                continue
+
+            process_job(job)
+        except sqlite3.Error as e:
+            print(f"⚠️  File de préchargement indisponible ({e})")
+            time.sleep(5)
+        except Exception as e:
+            print(f"🔥 Erreur inattendue du préchargement: {type(e).__name__} - {e}")
+            time.sleep(5)
+
+        time.sleep(max(0.0, interval - (time.time() - started)))
+
+
+def process_job(job):
+    """Précharge une entrée de la file et la retire ou compte la tentative."""
+    from ratelimit import RateLimitTimeout
+
+    video_id, language = job['video_id'], job['language']
+    try:
+        transcript = prefetch_one(video_id, language)
+        _db().execute('DELETE FROM prefetch_queue WHERE video_id = ? AND language = ?',
+                      (video_id, language))
+        print(f"✅ Préchargé {video_id} [{transcript['language']}] "
+              f"{len(transcript['segments'])} segments")
+    except RateLimitTimeout:
+        # Pas un échec de la vidéo : on réessaie plus tard sans consommer de tentative
+        print(f"⏳ Préchargement de {video_id} reporté (limite de débit)")
+    except Exception as e:
+        # SubtitleError ou erreur imprévue : la tentative compte, la vidéo ne bloque pas la file
+        if job['attempts'] + 1 >= MAX_ATTEMPTS:
+            _db().execute('DELETE FROM prefetch_queue WHERE video_id = ? AND language = ?',
+                          (video_id, language))
+            print(f"❌ Abandon du préchargement de {video_id}: {e}")
+        else:
+            _db().execute('UPDATE prefetch_queue SET attempts = attempts + 1 '
+                          'WHERE video_id = ? AND language = ?', (video_id, language))
+            print(f"⚠️  Échec du préchargement de {video_id}: {e}")
+
+
+def main(argv):
+    if len(argv) < 2 or argv[1] not in ('worker', 'add', 'file'):
+        print(__doc__)
+        return 1
+
+    command = argv[1]
+    if command == 'worker':
+        run_worker()
+    elif command == 'add':
+        print(f"✅ {enqueue(argv[2:], source='cli')} vidéo(s) ajoutée(s) à la file")
+    else:
+        for path in argv[2:]:
+            print(f"✅ {enqueue_file(path)} vidéo(s) ajoutée(s) depuis {path}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
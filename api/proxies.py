@@ -0,0 +1,271 @@
+import hashlib
+import os
+import random
+import threading
+import time
+from urllib.parse import urlsplit, urlunsplit
+
+
+# ==================== CONFIGURATION ====================
+
+# Durée de mise à l'écart d'un proxy après un blocage anti-bot (secondes)
+PROXY_COOLDOWN = float(os.getenv('PROXY_COOLDOWN', 600))
+
+# Durée pendant laquelle une vidéo reste attachée au même proxy (secondes)
+PROXY_STICKY_TTL = float(os.getenv('PROXY_STICKY_TTL', 1800))
+
+# 'weighted' (tirage pondéré par la santé) ou 'least_loaded'
+PROXY_STRATEGY = os.getenv('PROXY_STRATEGY', 'weighted')
+
+# Lissage exponentiel des scores de santé et de latence
+HEALTH_ALPHA = 0.2
+LATENCY_ALPHA = 0.3
+
+# Score minimal pour qu'un proxy reste sélectionnable hors cooldown
+MIN_HEALTH = 0.05
+
+# Demi-vie de la remontée de santé d'un proxy inutilisé (secondes)
+PROXY_HEALTH_RECOVERY = float(os.getenv('PROXY_HEALTH_RECOVERY', 300))
+
+
+def _credentials_tag(parts):
+    """Empreinte courte de l'identifiant : distingue user-1@hote et user-2@hote."""
+    return hashlib.sha256((parts.username or '').encode('utf-8')).hexdigest()[:8]
+
+
+def mask_proxy(url):
+    """Masque les identifiants d'une URL de proxy pour les logs et les stats."""
+    try:
+        parts = urlsplit(url)
+        if parts.username or parts.password:
+            host = parts.hostname or ''
+            if parts.port:
+                host = f"{host}:{parts.port}"
+            return urlunsplit((parts.scheme, f"***-{_credentials_tag(parts)}@{host}", parts.path, '', ''))
+    except ValueError:
+        pass
+    return url
+
+
+def proxy_key(url):
+    """Identité d'un proxy pour le limiteur de débit : hôte, port et empreinte de l'identifiant."""
+    parts = urlsplit(url)
+    key = f"{parts.hostname}:{parts.port or ''}"
+    if parts.username:
+        key += f":{_credentials_tag(parts)}"
+    return key
+
+
+# ==================== ÉTAT D'UN PROXY ====================
+
+class ProxyState:
+    """Santé, latence et charge courante d'un proxy."""
+
+    def __init__(self, url):
+        self.url = url
+        self.name = mask_proxy(url)
+        self.health = 1.0
+        self.latency = None
+        self.in_flight = 0
+        self.successes = 0
+        self.failures = 0
+        self.blocks = 0
+        self.cooldown_until = 0.0
+        self.updated_at = time.time()
+
+    def recover(self, now):
+        """Remontée progressive de la santé avec le temps (jamais pendant un cooldown)."""
+        if now < self.cooldown_until:
+            self.updated_at = now
+            return
+        elapsed = now - max(self.updated_at, self.cooldown_until)
+        if elapsed > 0:
+            self.health += (1.0 - self.health) * (1.0 - 0.5 ** (elapsed / PROXY_HEALTH_RECOVERY))
+        self.updated_at = now
+
+    def is_available(self, now):
+        return now >= self.cooldown_until and self.health >= MIN_HEALTH
+
+    def weight(self):
+        # Les proxys rapides et sains sont favorisés, les proxys chargés pénalisés
+        latency = self.latency if self.latency is not None else 1.0
+        return max(self.health, MIN_HEALTH) / (max(latency, 0.1) * (1 + self.in_flight))
+
+    def to_dict(self, now):
+        return {
+            'proxy': self.name,
+            'health': round(self.health, 3),
+            'latencyMs': round(self.latency * 1000) if self.latency is not None else None,
+            'inFlight': self.in_flight,
+            'successes': self.successes,
+            'failures': self.failures,
+            'blocks': self.blocks,
+            'cooldownRemaining': max(0, round(self.cooldown_until - now)),
+        }
+
+
+# ==================== POOL ====================
+
+class ProxyPool:
+    """
+    Pool de proxys avec suivi de santé et répartition de charge.
+    - acquire(video_id) : choisit un proxy (collant par vidéo)
+    - release(proxy, ...) : remonte le résultat (succès, échec, blocage)
+    """
+
+    def __init__(self, urls, strategy=PROXY_STRATEGY, cooldown=PROXY_COOLDOWN,
+                 sticky_ttl=PROXY_STICKY_TTL):
+        self.proxies = [ProxyState(url) for url in dict.fromkeys(urls)]
+        self.strategy = strategy
+        self.cooldown = cooldown
+        self.sticky_ttl = sticky_ttl
+        self._sticky = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.proxies)
+
+    def _find(self, url):
+        for state in self.proxies:
+            if state.url == url:
+                return state
+        return None
+
+    def _pick(self, candidates):
+        if self.strategy == 'least_loaded':
+            return min(candidates, key=lambda p: (p.in_flight, p.latency or 0.0, -p.health))
+        weights = [p.weight() for p in candidates]
+        return random.choices(candidates, weights=weights, k=1)[0]
+
+    def acquire(self, video_id=None):
+        """Retourne l'URL du proxy à utiliser, ou None si le pool est vide."""
+        if not self.proxies:
+            return None
+
+        now = time.time()
+        with self._lock:
+            for state in self.proxies:
+                state.recover(now)
+            chosen = None
+
+            if video_id:
+                sticky = self._sticky.get(video_id)
+                if sticky and sticky[1] > now:
+                    state = self._find(sticky[0])
+                    if state and state.is_available(now):
+                        chosen = state
+
+            if chosen is None:
+                candidates = [p for p in self.proxies if p.is_available(now)]
+                if candidates:
+                    chosen = self._pick(candidates)
+                else:
+                    # Tous en cooldown : on prend celui qui en sortira le plus tôt
+                    chosen = min(self.proxies, key=lambda p: p.cooldown_until)
+                    print(f"⚠️  Tous les proxys sont en cooldown, repli sur {chosen.name}")
+
+            if video_id:
+                self._sticky[video_id] = (chosen.url, now + self.sticky_ttl)
+                if len(self._sticky) > 10000:
+                    self._sticky = {k: v for k, v in self._sticky.items() if v[1] > now}
+
+            chosen.in_flight += 1
+            return chosen.url
+
+    def release(self, url, success=True, latency=None, blocked=False):
+        """
+        Met à jour la santé du proxy après une requête.
+        success=None : échec sans rapport avec le proxy (vidéo privée, limite locale),
+        la santé n'est pas modifiée.
+        """
+        if not url:
+            return
+        with self._lock:
+            state = self._find(url)
+            if state is None:
+                return
+
+            state.in_flight = max(0, state.in_flight - 1)
+            state.recover(time.time())
+
+            if latency is not None:
+                if state.latency is None:
+                    state.latency = latency
+                else:
+                    state.latency += LATENCY_ALPHA * (latency - state.latency)
+
+            if blocked:
+                state.blocks += 1
+                state.failures += 1
+                state.health *= 0.5
+                state.cooldown_until = time.time() + self.cooldown
+                # Les vidéos attachées à ce proxy seront réaffectées
+                self._sticky = {k: v for k, v in self._sticky.items() if v[0] != url}
+                print(f"🚫 Proxy {state.name} bloqué, cooldown {int(self.cooldown)}s")
+            elif success:
+                state.successes += 1
+                state.health += HEALTH_ALPHA * (1.0 - state.health)
+            elif success is not None:
+                state.failures += 1
+                state.health -= HEALTH_ALPHA * state.health
+
+    def stats(self):
+        now = time.time()
+        with self._lock:
+            for state in self.proxies:
+                state.recover(now)
+            return {
+                'strategy': self.strategy,
+                'count': len(self.proxies),
+                'available': sum(1 for p in self.proxies if p.is_available(now)),
+                'proxies': [p.to_dict(now) for p in self.proxies],
+            }
+
+
+# ==================== CHARGEMENT ====================
+
+def load_proxy_urls():
+    """
+    Lit la liste des proxys depuis l'environnement :
+    - WEBSHARE_PROXIES     : URLs séparées par des virgules ou des retours à la ligne
+    - WEBSHARE_PROXY_FILE  : fichier avec une URL par ligne
+    - WEBSHARE_PROXY       : proxy unique (compatibilité)
+    """
+    urls = []
+
+    for line in os.getenv('WEBSHARE_PROXIES', '').replace(',', '\n').splitlines():
+        if line.strip():
+            urls.append(line.strip())
+
+    proxy_file = os.getenv('WEBSHARE_PROXY_FILE')
+    if proxy_file:
+        try:
+            with open(proxy_file) as f:
+                for line in f:
+                    line = line.strip()
+                    if line and not line.startswith('#'):
+                        urls.append(line)
+        except OSError as e:
+            print(f"❌ Lecture du fichier de proxys impossible: {e}")
+
+    single = os.getenv('WEBSHARE_PROXY')
+    if single:
+        urls.append(single.strip())
+
+    return urls
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_proxy_pool():
+    """Pool partagé par le processus, construit au premier appel."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ProxyPool(load_proxy_urls())
+                if len(_pool):
+                    print(f"✅ {len(_pool)} proxy(s) résidentiel(s) configuré(s) [{_pool.strategy}]")
+    return _pool
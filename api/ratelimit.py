@@ -0,0 +1,226 @@
+import os
+import random
+import sqlite3
+import time
+from urllib.parse import urlsplit
+
+from proxies import proxy_key
+from storage import connect
+
+
+# ==================== CONFIGURATION ====================
+
+# Débit maximal (requêtes/s) et rafale par type d'identité amont
+LIMITS = {
+    'host': (float(os.getenv('RATE_LIMIT_HOST_RPS', 2.0)), float(os.getenv('RATE_LIMIT_HOST_BURST', 4))),
+    'proxy': (float(os.getenv('RATE_LIMIT_PROXY_RPS', 0.5)), float(os.getenv('RATE_LIMIT_PROXY_BURST', 2))),
+    'cookies': (float(os.getenv('RATE_LIMIT_COOKIE_RPS', 0.33)), float(os.getenv('RATE_LIMIT_COOKIE_BURST', 2))),
+}
+
+# AIMD : division du débit après un blocage, remontée progressive après un succès
+DECREASE_FACTOR = 0.5
+INCREASE_RATIO = 0.05
+MIN_RATE_RATIO = 0.05
+
+# Attente maximale avant abandon, selon la priorité (secondes)
+MAX_WAIT = {
+    'interactive': float(os.getenv('RATE_LIMIT_MAX_WAIT', 10)),
+    'batch': float(os.getenv('RATE_LIMIT_BATCH_MAX_WAIT', 120)),
+}
+
+# Part de la rafale réservée aux requêtes interactives
+BATCH_RESERVE = 0.5
+
+PRIORITY_INTERACTIVE = 'interactive'
+PRIORITY_BATCH = 'batch'
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS buckets (
+    key TEXT PRIMARY KEY,
+    tokens REAL NOT NULL,
+    rate REAL NOT NULL,
+    updated REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS waiters (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    priority TEXT NOT NULL,
+    created REAL NOT NULL
+);
+'''
+
+
+class RateLimitTimeout(Exception):
+    """L'attente d'un créneau amont dépasse le temps autorisé."""
+
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def _db():
+    return connect('ratelimit', SCHEMA)
+
+
+def _limits(key):
+    return LIMITS.get(key.split(':', 1)[0], LIMITS['host'])
+
+
+# ==================== IDENTITÉS ====================
+
+def upstream_keys(url, proxy=None, identity=None):
+    """Clés de seaux pour une requête : hôte amont, proxy et compte cookies."""
+    keys = [f"host:{urlsplit(url).hostname or url}"]
+    if proxy:
+        keys.append(f"proxy:{proxy_key(proxy)}")
+    if identity:
+        keys.append(f"cookies:{identity}")
+    return keys
+
+
+# ==================== SEAUX À JETONS ====================
+
+def _load_buckets(conn, keys, now):
+    buckets = {}
+    for key in keys:
+        max_rate, burst = _limits(key)
+        row = conn.execute('SELECT tokens, rate, updated FROM buckets WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            tokens, rate = burst, max_rate
+        else:
+            rate = row['rate']
+            tokens = min(burst, row['tokens'] + (now - row['updated']) * rate)
+        buckets[key] = {'tokens': tokens, 'rate': rate, 'burst': burst}
+    return buckets
+
+
+def _save_buckets(conn, buckets, now):
+    for key, b in buckets.items():
+        conn.execute(
+            'INSERT OR REPLACE INTO buckets (key, tokens, rate, updated) VALUES (?, ?, ?, ?)',
+            (key, b['tokens'], b['rate'], now)
+        )
+
+
+def _try_take(keys, priority, tokens=1):
+    """
+    Tente de prendre `tokens` jetons dans chaque seau. Retourne 0 ou le délai d'attente estimé.
+    Au-delà de la rafale, le seau passe en négatif : les requêtes suivantes paient la différence.
+    """
+    conn = _db()
+    now = time.time()
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        buckets = _load_buckets(conn, keys, now)
+
+        wait = 0.0
+        for b in buckets.values():
+            reserve = BATCH_RESERVE * b['burst'] if priority == PRIORITY_BATCH else 0.0
+            need = min(float(tokens), b['burst'] - reserve) + reserve
+            if b['tokens'] < need:
+                wait = max(wait, (need - b['tokens']) / b['rate'])
+
+        if wait == 0.0 and priority == PRIORITY_BATCH:
+            waiting = conn.execute(
+                'SELECT COUNT(*) FROM waiters WHERE priority = ? AND created > ?',
+                (PRIORITY_INTERACTIVE, now - MAX_WAIT[PRIORITY_INTERACTIVE])
+            ).fetchone()[0]
+            if waiting:
+                wait = 0.5
+
+        if wait == 0.0:
+            for b in buckets.values():
+                b['tokens'] -= tokens
+
+        _save_buckets(conn, buckets, now)
+        conn.execute('COMMIT')
+        return wait
+    except BaseException:
+        conn.execute('ROLLBACK')
+        raise
+
+
+def acquire(keys, priority=PRIORITY_INTERACTIVE, max_wait=None, tokens=1):
+    """
+    Attend `tokens` créneaux sur tous les seaux (partagés entre workers via SQLite),
+    pris en une seule transaction.
+    Les requêtes batch laissent passer les interactives et gardent une réserve.
+    Lève RateLimitTimeout si l'attente dépasse max_wait.
+    """
+    if max_wait is None:
+        max_wait = MAX_WAIT.get(priority, MAX_WAIT[PRIORITY_INTERACTIVE])
+    deadline = time.time() + max_wait
+    waiter_id = None
+
+    try:
+        conn = _db()
+        if priority == PRIORITY_INTERACTIVE:
+            waiter_id = conn.execute(
+                'INSERT INTO waiters (priority, created) VALUES (?, ?)', (priority, time.time())
+            ).lastrowid
+
+        while True:
+            wait = _try_take(keys, priority, tokens)
+            if wait == 0.0:
+                return
+            remaining = deadline - time.time()
+            if wait > remaining:
+                print(f"⏳ Limite de débit atteinte pour {', '.join(keys)}")
+                raise RateLimitTimeout('Trop de requêtes vers YouTube, réessayez plus tard',
+                                       retry_after=max(1, int(wait)))
+            time.sleep(min(wait, 1.0) + random.uniform(0, 0.05))
+
+    except sqlite3.Error as e:
+        # Le limiteur ne doit jamais rendre le service indisponible
+        print(f"⚠️  Limiteur de débit indisponible ({e}), requête autorisée")
+
+    finally:
+        if waiter_id is not None:
+            try:
+                _db().execute('DELETE FROM waiters WHERE id = ?', (waiter_id,))
+            except sqlite3.Error:
+                pass
+
+
+def report(keys, blocked=False):
+    """Ajuste le débit (AIMD) après une réponse amont."""
+    try:
+        conn = _db()
+        now = time.time()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            buckets = _load_buckets(conn, keys, now)
+            for key, b in buckets.items():
+                max_rate = _limits(key)[0]
+                if blocked:
+                    b['rate'] = max(max_rate * MIN_RATE_RATIO, b['rate'] * DECREASE_FACTOR)
+                    b['tokens'] = min(b['tokens'], 0.0)
+                else:
+                    b['rate'] = min(max_rate, b['rate'] + max_rate * INCREASE_RATIO)
+            _save_buckets(conn, buckets, now)
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        if blocked:
+            print(f"📉 Débit réduit pour {', '.join(keys)}")
+    except sqlite3.Error as e:
+        print(f"⚠️  Limiteur de débit indisponible ({e})")
+
+
+def stats():
+    """Débit courant de chaque seau."""
+    try:
+        now = time.time()
+        rows = _db().execute('SELECT key FROM buckets ORDER BY key').fetchall()
+        keys = [row['key'] for row in rows]
+        buckets = _load_buckets(_db(), keys, now)
+        return {
+            key: {
+                'rate': round(b['rate'], 3),
+                'maxRate': _limits(key)[0],
+                'tokens': round(b['tokens'], 2),
+            }
+            for key, b in buckets.items()
+        }
+    except sqlite3.Error as e:
+        return {'error': str(e)}
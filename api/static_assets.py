@@ -0,0 +1,98 @@
+import json
+import mimetypes
+import os
+import threading
+
+from flask import abort, request, send_file, send_from_directory
+
+from http_cache import negotiate_encoding
+
+
+# Sortie de build_assets.py
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DIST_DIR = os.path.join(ROOT_DIR, 'dist')
+MANIFEST_PATH = os.path.join(DIST_DIR, 'asset-manifest.json')
+
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+REVALIDATE_CACHE_CONTROL = 'no-cache'
+
+ENCODING_SUFFIXES = {'br': '.br', 'gzip': '.gz'}
+
+# Sans dist/ : seuls ces fichiers sources sont publics (mêmes listes que build_assets.py)
+PUBLIC_FILES = {'index.html', 'about.html', 'contact.html', 'privacy_policy.html', 'terms.html',
+                'manifest.json', 'service-worker.js'}
+PUBLIC_DIRS = ('icons/', 'screenshots/')
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def _load_index():
+    """Index chemin demandé -> entrée du manifest (nom logique et nom avec empreinte)."""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                index = {}
+                try:
+                    with open(MANIFEST_PATH) as f:
+                        manifest = json.load(f)
+                    for logical, entry in manifest['assets'].items():
+                        index[logical] = entry
+                        index[entry['path']] = entry
+                    print(f"✅ Ressources précompressées chargées (build {manifest['build']})")
+                except (OSError, ValueError, KeyError) as e:
+                    print(f"⚠️  dist/ indisponible ({e}), fichiers servis depuis les sources")
+                _index = index
+    return _index
+
+
+def serve_asset(path):
+    """
+    Sert un fichier de dist/ dans la meilleure variante acceptée (br, gzip, brut).
+    Les fichiers avec empreinte sont 'immutable', les autres revalidés par ETag.
+    Retourne None si le fichier n'est pas dans le manifest.
+    """
+    entry = _load_index().get(path)
+    if entry is None:
+        return None
+
+    encoding = negotiate_encoding(request.accept_encodings, entry['encodings'])
+    filename = os.path.join(DIST_DIR, entry['path'])
+    if encoding:
+        filename += ENCODING_SUFFIXES[encoding]
+
+    mimetype = mimetypes.guess_type(entry['path'])[0] or 'application/octet-stream'
+    response = send_file(filename, mimetype=mimetype, etag=False, conditional=False)
+    response.headers.pop('Content-Disposition', None)
+
+    response.vary.add('Accept-Encoding')
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+        response.set_etag(f"{entry['hash']}-{encoding}")
+    else:
+        response.set_etag(entry['hash'])
+
+    immutable = entry['immutable'] and path == entry['path']
+    response.headers['Cache-Control'] = IMMUTABLE_CACHE_CONTROL if immutable else REVALIDATE_CACHE_CONTROL
+    return response.make_conditional(request)
+
+
+def is_public_source(path):
+    """Fichier du dépôt servable sans build (jamais .git, api/, render.yaml...)."""
+    if path in PUBLIC_FILES:
+        return True
+    return path.startswith(PUBLIC_DIRS) and '..' not in path.split('/')
+
+
+def serve_public(path):
+    """
+    Ressource statique : entrées du manifest si dist/ existe, sinon liste blanche
+    des sources. Tout autre chemin donne 404.
+    """
+    response = serve_asset(path)
+    if response is not None:
+        return response
+    if _load_index() or not is_public_source(path):
+        abort(404)
+    return send_from_directory(ROOT_DIR, path)
@@ -0,0 +1,39 @@
+import os
+import sqlite3
+import tempfile
+import threading
+
+
+# Dossier des bases SQLite partagées entre les workers gunicorn d'une instance
+DATA_DIR = os.getenv('DATA_DIR', os.path.join(tempfile.gettempdir(), 'yt-creator-tools'))
+
+_local = threading.local()
+
+
+def db_path(name):
+    """Chemin d'une base SQLite dans DATA_DIR."""
+    os.makedirs(DATA_DIR, exist_ok=True)
+    return os.path.join(DATA_DIR, f'{name}.sqlite3')
+
+
+def connect(name, schema=None):
+    """
+    Connexion SQLite réutilisée par thread et par processus.
+    Une connexion n'est jamais partagée après un fork (gunicorn --preload).
+    Les transactions sont explicites (isolation_level=None).
+    """
+    conns = getattr(_local, 'conns', None)
+    if conns is None or getattr(_local, 'pid', None) != os.getpid():
+        conns = _local.conns = {}
+        _local.pid = os.getpid()
+
+    conn = conns.get(name)
+    if conn is None:
+        conn = sqlite3.connect(db_path(name), timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        if schema:
+            conn.executescript(schema)
+        conns[name] = conn
+    return conn
@@ -1,62 +1,119 @@
 import yt_dlp
+import bisect
 import re
 import json
 import os
-import tempfile
 import urllib.request
+import time
 import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
 
-print("✅ Module subtitles chargé avec support cookies")
+from cache import (claim_refresh, get_cached_entry, get_cached_transcript, get_live_segments,
+                   put_cached_transcript, record_request, release_refresh, segment_ms)
+from cookies import get_cookie_pool
+from errors import SubtitleError
+from proxies import get_proxy_pool, mask_proxy
+from ratelimit import PRIORITY_BATCH, PRIORITY_INTERACTIVE, RateLimitTimeout, acquire, report, upstream_keys
 
 
-class SubtitleError(Exception):
-    """Exception personnalisée pour les erreurs de sous-titres"""
-    pass
+# Nombre maximal de pistes (langues) téléchargées en parallèle
+MAX_PARALLEL_TRACKS = int(os.getenv('MAX_PARALLEL_TRACKS', 4))
+
+# Hôte des fichiers de pistes : les téléchargements d'une requête comptent pour un créneau
+TIMEDTEXT_URL = 'https://www.youtube.com/api/timedtext'
 
 
 # ==================== PROXY ====================
 
-def setup_proxy():
-    """Configure le proxy résidentiel Webshare depuis la variable d'environnement."""
-    proxy = os.getenv('WEBSHARE_PROXY')
+def setup_proxy(video_id=None):
+    """
+    Choisit un proxy résidentiel dans le pool (voir proxies.py).
+    L'appelant doit rendre le proxy via release_proxy().
+    """
+    proxy = get_proxy_pool().acquire(video_id)
     if proxy:
-        print("✅ Proxy résidentiel Webshare configuré")
+        print(f"✅ Proxy résidentiel: {mask_proxy(proxy)}")
         return proxy
     print("⚠️  Aucun proxy configuré - mode direct")
     return None
 
 
+def release_upstream(keys, success=True, blocked=False):
+    """Remonte le résultat au limiteur de débit (AIMD)."""
+    if blocked or success:
+        report(keys, blocked=blocked)
+
+
+def release_proxy(proxy, started, success=True, blocked=False):
+    """
+    Remonte le résultat d'une requête au pool de proxys.
+    success=None : l'échec ne vient pas du proxy, sa santé n'est pas modifiée.
+    started=None : la requête n'est pas partie (limite de débit locale), pas de latence.
+    """
+    if proxy:
+        latency = time.time() - started if started is not None else None
+        get_proxy_pool().release(proxy, success=success, latency=latency, blocked=blocked)
+
+
+def is_antibot_error(error_msg):
+    """Détecte les réponses anti-bot de YouTube."""
+    return ('Sign in to confirm' in error_msg or 'HTTP Error 429' in error_msg
+            or 'Too Many Requests' in error_msg)
+
+
+def is_network_error(error_msg):
+    """Erreurs réseau imputables au proxy (connexion, tunnel, délai, 407, 5xx)."""
+    markers = ('timed out', 'Connection refused', 'Connection reset', 'Connection aborted',
+               'Remote end closed', 'Unable to connect', 'Tunnel connection failed', 'ProxyError',
+               'Network is unreachable', 'urlopen error', 'HTTP Error 407', 'HTTP Error 502',
+               'HTTP Error 503', 'HTTP Error 504')
+    return any(marker in error_msg for marker in markers)
+
+
+def open_url(url, proxy=None, timeout=15):
+    """Télécharge une URL (fichier de sous-titres) via le même proxy que l'extraction."""
+    handlers = []
+    if proxy:
+        handlers.append(urllib.request.ProxyHandler({'http': proxy, 'https': proxy}))
+    opener = urllib.request.build_opener(*handlers)
+    req = urllib.request.Request(
+        url,
+        headers={'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'}
+    )
+    with opener.open(req, timeout=timeout) as response:
+        return response.read().decode('utf-8')
+
+
 # ==================== COOKIES ====================
 
 def setup_cookies():
-    """Configure les cookies YouTube depuis les variables d'environnement ou fichiers."""
-    cookies_env = os.getenv('YOUTUBE_COOKIES')
-    if cookies_env:
-        try:
-            with tempfile.NamedTemporaryFile(mode='w', suffix='.txt', delete=False) as f:
-                f.write(cookies_env)
-                cookies_path = f.name
-            print(f"✅ Cookies chargés depuis variable d'environnement: {cookies_path}")
-            return cookies_path
-        except Exception as e:
-            print(f"❌ Erreur création fichier cookies: {e}")
+    """
+    Choisit un compte cookies dans le pool (voir cookies.py).
+    L'appelant doit rendre le compte via release_cookies().
+    """
+    return get_cookie_pool().acquire()
 
-    for candidate in ['cookies.txt', os.path.join(os.path.dirname(__file__), 'cookies.txt')]:
-        if os.path.exists(candidate):
-            print(f"✅ Cookies trouvés: {candidate}")
-            return candidate
 
-    return None
+def release_cookies(cookies_file, started, success=True, blocked=False):
+    """Remonte le résultat d'une requête au pool de comptes cookies (started : voir release_proxy)."""
+    if not cookies_file:
+        return
+    if started is None:
+        get_cookie_pool().cancel(cookies_file)
+    else:
+        get_cookie_pool().release(cookies_file, success=success,
+                                  latency=time.time() - started, blocked=blocked)
 
 
 # ==================== OPTIONS DE BASE ====================
 
-def get_ydl_base_opts():
+def get_ydl_base_opts(proxy=None):
     """
     Options yt-dlp communes (2026).
     - android_vr  : client principal, sans PO Token requis
     - web_embedded: fallback pour la majorité des vidéos publiques
     Avec Deno installé (render.yaml), tous les formats sont disponibles.
+    Le proxy est choisi par l'appelant via setup_proxy().
     """
     opts = {
         'skip_download': True,
@@ -71,7 +128,6 @@ def get_ydl_base_opts():
     }
 
     # Proxy résidentiel Webshare
-    proxy = setup_proxy()
     if proxy:
         opts['proxy'] = proxy
 
@@ -95,16 +151,23 @@ def get_ydl_base_opts():
 def get_available_languages(video_id):
     """Récupère la liste des langues de sous-titres disponibles."""
     print(f"🔍 Recherche des langues disponibles pour: {video_id}")
+    cookies_file = setup_cookies()
+    proxy = setup_proxy(video_id)
+    url = f'https://www.youtube.com/watch?v={video_id}'
+    upstream = upstream_keys(url, proxy, get_cookie_pool().name_of(cookies_file))
+    started = None
+    proxy_ok, proxy_blocked = None, False
     try:
-        url = f'https://www.youtube.com/watch?v={video_id}'
-        ydl_opts = get_ydl_base_opts()
+        ydl_opts = get_ydl_base_opts(proxy)
 
-        cookies_file = setup_cookies()
         if cookies_file:
             ydl_opts['cookiefile'] = cookies_file
 
+        acquire(upstream)
+        started = time.time()
         with yt_dlp.YoutubeDL(ydl_opts) as ydl:
             info = ydl.extract_info(url, download=False)
+        proxy_ok = True
 
         subtitles = info.get('subtitles', {})
         automatic_captions = info.get('automatic_captions', {})
@@ -134,155 +197,413 @@ def get_available_languages(video_id):
         print(f"✅ {len(languages)} langues trouvées")
         return languages
 
-    except SubtitleError:
+    except (SubtitleError, RateLimitTimeout):
         raise
     except yt_dlp.utils.DownloadError as e:
         error_msg = str(e)
-        if 'Sign in to confirm' in error_msg:
+        if is_antibot_error(error_msg):
+            proxy_blocked = True
             raise SubtitleError('Blocage anti-bot détecté - cookies requis')
+        if is_network_error(error_msg):
+            proxy_ok = False
         if 'Video unavailable' in error_msg:
             raise SubtitleError('Vidéo non disponible')
         raise SubtitleError(f'Erreur yt-dlp : {error_msg}')
     except Exception as e:
         raise SubtitleError(f'Erreur inattendue : {type(e).__name__} - {str(e)}')
+    finally:
+        release_proxy(proxy, started, success=proxy_ok, blocked=proxy_blocked)
+        release_cookies(cookies_file, started, success=proxy_ok, blocked=proxy_blocked)
+        release_upstream(upstream, success=proxy_ok, blocked=proxy_blocked)
+
+
+# ==================== PLAYLISTS ====================
+
+def list_playlist_videos(playlist_id, priority=PRIORITY_BATCH):
+    """Liste les IDs des vidéos d'une playlist (extraction à plat, sans détails)."""
+    print(f"📋 Lecture de la playlist: {playlist_id}")
+    url = f'https://www.youtube.com/playlist?list={playlist_id}'
+    proxy = setup_proxy()
+    upstream = upstream_keys(url, proxy)
+    started = None
+    proxy_ok, proxy_blocked = None, False
+    try:
+        ydl_opts = get_ydl_base_opts(proxy)
+        ydl_opts['extract_flat'] = 'in_playlist'
+
+        acquire(upstream, priority)
+        started = time.time()
+        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+            info = ydl.extract_info(url, download=False)
+        proxy_ok = True
+
+        video_ids = [entry['id'] for entry in info.get('entries') or [] if entry and entry.get('id')]
+        if not video_ids:
+            raise SubtitleError('Playlist vide ou introuvable')
+        return video_ids
+
+    except (SubtitleError, RateLimitTimeout):
+        raise
+    except yt_dlp.utils.DownloadError as e:
+        error_msg = str(e)
+        if is_antibot_error(error_msg):
+            proxy_blocked = True
+            raise SubtitleError('Blocage anti-bot détecté - cookies requis')
+        if is_network_error(error_msg):
+            proxy_ok = False
+        raise SubtitleError(f'Erreur yt-dlp : {error_msg}')
+    except Exception as e:
+        raise SubtitleError(f'Erreur inattendue : {type(e).__name__} - {str(e)}')
+    finally:
+        release_proxy(proxy, started, success=proxy_ok, blocked=proxy_blocked)
+        release_upstream(upstream, success=proxy_ok, blocked=proxy_blocked)
 
 
 # ==================== SOUS-TITRES ====================
 
-def get_subtitles(video_id, format_type='txt', language='fr'):
+def get_subtitles(video_id, format_type='txt', language='fr', priority=PRIORITY_INTERACTIVE,
+                  since=None):
     """
     Récupère et formate les sous-titres d'une vidéo YouTube.
+    Les segments parsés sont servis depuis le cache partagé (cache.py) si présents.
 
     Args:
         video_id   : ID YouTube (ex: 'dQw4w9WgXcQ')
         format_type: 'txt', 'srt' ou 'vtt'
         language   : code langue (ex: 'fr', 'en')
+        priority   : 'interactive' ou 'batch' (file du limiteur de débit)
+        since      : mode incrémental (live) : tStartMs du dernier segment déjà reçu,
+                     seuls les segments suivants sont retournés
 
     Returns:
-        dict avec 'content', 'language', 'format', 'lineCount', 'isAutoGenerated'
+        dict avec 'content', 'language', 'format', 'lineCount', 'isAutoGenerated',
+        'isLive' et 'cursor' (à renvoyer comme 'since' au prochain appel)
     """
-    print(f"🎯 Demande de sous-titres avec cookies: {video_id}")
+    record_request(video_id, language)
 
+    transcript, expired = get_cached_entry(video_id, language)
+    method = 'cache'
+    claimed = False
     try:
-        url = f'https://www.youtube.com/watch?v={video_id}'
-        ydl_opts = get_ydl_base_opts()
+        if transcript is not None and expired and transcript.get('live'):
+            # Live : un seul poll rafraîchit (sans refaire extract_info), les autres
+            # servent la version en cache, plus vieille de quelques secondes au plus
+            claimed = claim_refresh(video_id, language)
+            if claimed:
+                transcript = refresh_live_transcript(video_id, transcript, priority)
+                method = 'live_refresh'
+        elif transcript is None or expired:
+            transcript = None
+
+        if transcript is None:
+            transcript = fetch_transcript(video_id, language, priority)
+            method = 'yt-dlp_2026_proxy'
+
+        if method != 'cache':
+            transcript = put_cached_transcript(video_id, language, transcript)
+    finally:
+        if claimed:
+            release_refresh(video_id, language)
+
+    return build_result(video_id, language, transcript, format_type, method, since)
+
+
+def get_stale_subtitles(video_id, format_type='txt', language='fr', since=None):
+    """
+    Sous-titres servis depuis le cache uniquement, même expirés (délestage sous charge).
+    Retourne None si la vidéo n'a jamais été mise en cache.
+    """
+    transcript = get_cached_transcript(video_id, language, allow_stale=True)
+    if transcript is None:
+        return None
+    result = build_result(video_id, language, transcript, format_type, 'stale_cache', since)
+    result['stale'] = True
+    return result
+
+
+def build_result(video_id, language, transcript, format_type, method, since=None):
+    """Réponse de get_subtitles : transcription complète, ou delta après 'since'."""
+    if 'segments' in transcript:
+        segments = transcript['segments']
+        total = len(segments)
+        last_ms = segment_ms(segments[-1]) if segments else None
+        if since is not None:
+            segments = segments[bisect.bisect_right([segment_ms(seg) for seg in segments], since):]
+    else:
+        # Live : segments stockés ligne par ligne, seul le delta demandé est lu
+        segments = get_live_segments(video_id, language, since)
+        total = transcript['count']
+        last_ms = transcript['lastMs']
+
+    result = {
+        'videoId': video_id,
+        'language': transcript['language'],
+        'format': format_type,
+        'isAutoGenerated': transcript['isAutoGenerated'],
+        'isLive': bool(transcript.get('live')),
+        'cursor': str(last_ms) if last_ms is not None else None,
+        'method': method
+    }
+
+    if since is None:
+        result['content'] = format_transcript(segments, format_type)
+        result['lineCount'] = len(segments)
+        return result
+
+    # Delta : segments (triés) postérieurs au curseur, numérotation SRT continue
+    known = total - len(segments)
+    result.update({
+        'incremental': True,
+        'since': since,
+        'content': format_transcript(segments, format_type, first_index=known + 1, header=False),
+        'lineCount': len(segments),
+        'totalCount': total,
+    })
+    return result
+
+
+def load_segments(video_id, language, transcript):
+    """Segments d'une transcription en cache (lus dans live_segments pour un live)."""
+    if 'segments' in transcript:
+        return transcript
+    return dict(transcript, segments=get_live_segments(video_id, language))
+
+
+def get_subtitles_multi(video_id, format_type='txt', languages=('fr', 'en'), bilingual=False,
+                        priority=PRIORITY_INTERACTIVE):
+    """
+    Plusieurs langues en une seule extraction : les pistes absentes du cache sont
+    téléchargées ensemble (fetch_transcripts), sans repli sur une autre langue.
+    bilingual=True ajoute un SRT/VTT aligné sur la première langue.
+
+    Returns:
+        dict avec 'tracks' (une entrée par langue trouvée), 'missing' et 'bilingual'
+    """
+    transcripts = {}
+    for language in languages:
+        record_request(video_id, language)
+        transcript, expired = get_cached_entry(video_id, language)
+        if transcript is not None and not expired and transcript['language'] == language:
+            transcripts[language] = load_segments(video_id, language, transcript)
+
+    to_fetch = [language for language in languages if language not in transcripts]
+    method = 'cache'
+    errors = []
+    if to_fetch:
+        method = 'yt-dlp_2026_proxy'
+        for language, transcript in zip(to_fetch, fetch_transcripts(video_id, to_fetch, priority)):
+            if 'error' in transcript:
+                print(f"⚠️  [{language}] {transcript['error']}")
+                errors.append(transcript)
+                continue
+            put_cached_transcript(video_id, language, transcript)
+            transcripts[language] = transcript
+
+    found = [language for language in languages if language in transcripts]
+    if not found:
+        retry_after = [t['retryAfter'] for t in errors if 'retryAfter' in t]
+        if retry_after:
+            raise RateLimitTimeout('Trop de requêtes vers YouTube, réessayez plus tard',
+                                   retry_after=max(retry_after))
+        raise SubtitleError('Aucune des langues demandées n\'est disponible pour cette vidéo')
+
+    result = {
+        'videoId': video_id,
+        'format': format_type,
+        'languages': found,
+        'missing': [language for language in languages if language not in transcripts],
+        'tracks': [
+            {
+                'language': language,
+                'content': format_transcript(transcripts[language]['segments'], format_type),
+                'lineCount': len(transcripts[language]['segments']),
+                'isAutoGenerated': transcripts[language]['isAutoGenerated'],
+            }
+            for language in found
+        ],
+        'method': method
+    }
+
+    if bilingual:
+        merged = merge_bilingual([transcripts[language]['segments'] for language in found])
+        result['bilingual'] = format_transcript(merged, format_type)
+
+    return result
+
+
+def merge_bilingual(tracks):
+    """
+    Aligne plusieurs pistes sur la première (fusion linéaire des listes triées) :
+    chaque segment secondaire rejoint le segment principal en cours à son milieu.
+    """
+    primary = tracks[0]
+    if not primary:
+        return []
+
+    lines = [[seg['text'].strip()] for seg in primary]
+    for secondary in tracks[1:]:
+        extra = [[] for _ in primary]
+        i = 0
+        for seg in secondary:
+            middle = seg['start'] + seg['duration'] / 2
+            while i + 1 < len(primary) and primary[i + 1]['start'] <= middle:
+                i += 1
+            extra[i].append(seg['text'].strip())
+        for cue_lines, texts in zip(lines, extra):
+            if texts:
+                cue_lines.append(' '.join(texts))
+
+    return [
+        {'text': '\n'.join(cue_lines), 'start': seg['start'], 'duration': seg['duration']}
+        for seg, cue_lines in zip(primary, lines)
+    ]
+
+
+def refresh_live_transcript(video_id, transcript, priority=PRIORITY_INTERACTIVE):
+    """
+    Rafraîchit un live depuis l'URL de piste gardée en cache : pas d'extract_info.
+    L'URL timedtext ne sert que la piste entière (pas de requête partielle) : le
+    téléchargement grandit avec le live, mais seuls les segments après le dernier
+    tStartMs connu sont gardés, puis insérés en lignes par put_cached_transcript.
+    Retourne None si l'URL a expiré (extraction complète nécessaire).
+    """
+    source = transcript.get('source') or {}
+    if not source.get('url'):
+        return None
+
+    last_ms = transcript.get('lastMs')
+
+    proxy = setup_proxy(video_id)
+    upstream = upstream_keys(source['url'], proxy)
+    started = None
+    proxy_ok, proxy_blocked = None, False
+    try:
+        acquire(upstream, priority)
+        started = time.time()
+        raw_content = open_url(source['url'], proxy)
+        proxy_ok = True
+    except RateLimitTimeout:
+        raise
+    except Exception as e:
+        proxy_blocked = is_antibot_error(str(e))
+        if is_network_error(str(e)):
+            proxy_ok = False
+        print(f"⚠️  Rafraîchissement live impossible ({e}), extraction complète")
+        return None
+    finally:
+        release_proxy(proxy, started, success=proxy_ok, blocked=proxy_blocked)
+        release_upstream(upstream, success=proxy_ok, blocked=proxy_blocked)
+
+    new_segments = parse_caption(raw_content, source.get('ext', ''), after_ms=last_ms)
+    print(f"🔴 Live {video_id}: {len(new_segments)} nouveau(x) segment(s)")
+    return dict(transcript, segments=new_segments)
+
+
+def fetch_transcript(video_id, language='fr', priority=PRIORITY_INTERACTIVE):
+    """
+    Extrait (yt-dlp), télécharge et parse une piste de sous-titres, sans cache.
+    Repli sur 'fr', 'en' puis la première langue disponible.
+
+    Returns:
+        dict avec 'videoId', 'language', 'isAutoGenerated', 'segments'
+    """
+    return fetch_transcripts(video_id, [language], priority, exact=False)[0]
+
+
+def fetch_transcripts(video_id, languages, priority=PRIORITY_INTERACTIVE, exact=True):
+    """
+    Une seule extraction (extract_info) pour plusieurs langues : les pistes sont
+    téléchargées et parsées en parallèle.
+    exact=True : pas de repli, une langue absente donne {'language', 'error'}.
+
+    Returns:
+        liste (même ordre que languages) de dicts comme fetch_transcript
+    """
+    print(f"🎯 Demande de sous-titres avec cookies: {video_id} {languages}")
+    cookies_file = setup_cookies()
+    proxy = setup_proxy(video_id)
+    url = f'https://www.youtube.com/watch?v={video_id}'
+    upstream = upstream_keys(url, proxy, get_cookie_pool().name_of(cookies_file))
+    started = None
+    proxy_ok, proxy_blocked = None, False
+
+    try:
+        ydl_opts = get_ydl_base_opts(proxy)
         ydl_opts.update({
             'writesubtitles': True,
             'writeautomaticsub': True,
-            'subtitleslangs': [language, 'fr', 'en'],
+            'subtitleslangs': list(languages) if exact else [languages[0], 'fr', 'en'],
             'extract_flat': False,
         })
 
-        cookies_file = setup_cookies()
         if cookies_file:
             ydl_opts['cookiefile'] = cookies_file
-            print(f"✅ Utilisation des cookies: {cookies_file}")
+            print(f"✅ Utilisation des cookies: {get_cookie_pool().name_of(cookies_file)}")
         else:
             print("⚠️  Aucun cookie disponible - mode sans authentification")
 
+        acquire(upstream, priority)
+        started = time.time()
         with yt_dlp.YoutubeDL(ydl_opts) as ydl:
             info = ydl.extract_info(url, download=False)
+        proxy_ok = True
 
-        subtitles = info.get('subtitles', {})
-        automatic_captions = info.get('automatic_captions', {})
-        all_subs = {**automatic_captions, **subtitles}
-
-        if not all_subs:
+        if not info.get('subtitles') and not info.get('automatic_captions'):
             raise SubtitleError('Aucun sous-titre disponible pour cette vidéo')
 
-        # Sélection de la langue
-        selected_lang = None
-        is_auto = False
-        subtitle_data = None
-
-        for lang in [language, 'fr', 'en']:
-            if lang in subtitles:
-                selected_lang, subtitle_data, is_auto = lang, subtitles[lang], False
-                break
-            if lang in automatic_captions:
-                selected_lang, subtitle_data, is_auto = lang, automatic_captions[lang], True
-                break
-
-        if not selected_lang:
-            selected_lang = list(all_subs.keys())[0]
-            subtitle_data = all_subs[selected_lang]
-            is_auto = selected_lang in automatic_captions
-
-        if not subtitle_data:
-            raise SubtitleError('Données de sous-titres vides pour cette langue')
-
-        # Meilleur format disponible
-        chosen_fmt = None
-        for preferred_ext in ['json3', 'srv1', 'vtt', 'ttml']:
-            for fmt in subtitle_data:
-                if fmt.get('ext') == preferred_ext:
-                    chosen_fmt = fmt
-                    break
-            if chosen_fmt:
-                break
-        if not chosen_fmt:
-            chosen_fmt = subtitle_data[0]
-
-        print(f"📥 Téléchargement [{selected_lang}] format [{chosen_fmt.get('ext')}]")
-
-        # Téléchargement
-        try:
-            req = urllib.request.Request(
-                chosen_fmt['url'],
-                headers={'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'}
-            )
-            response = urllib.request.urlopen(req, timeout=15)
-            raw_content = response.read().decode('utf-8')
-        except Exception as e:
-            raise SubtitleError(f'Impossible de télécharger le fichier de sous-titres : {e}')
-
-        # Parsing
-        transcript_data = []
-        ext = chosen_fmt.get('ext', '')
-
-        if ext == 'json3' or raw_content.strip().startswith('{'):
-            try:
-                transcript_data = parse_youtube_json(json.loads(raw_content))
-            except Exception as e:
-                print(f"⚠️  Parsing JSON3 échoué ({e}), tentative XML...")
+        is_live = bool(info.get('is_live') or
+                       info.get('live_status') in ('is_live', 'is_upcoming', 'post_live'))
 
-        if not transcript_data:
-            transcript_data = parse_xml_subtitles(raw_content)
-
-        if not transcript_data:
-            raise SubtitleError('Impossible de parser le contenu des sous-titres')
+        # Un jeton du limiteur par piste à télécharger, pris en une fois avant les
+        # téléchargements parallèles ; l'attente n'entre pas dans la latence du proxy
+        downloads = sum(1 for language in languages if select_track(info, language, exact))
+        waited = time.time()
+        try:
+            if downloads:
+                acquire(upstream_keys(TIMEDTEXT_URL, proxy), priority, tokens=downloads)
+        except RateLimitTimeout as e:
+            if not exact:
+                raise
+            return [{'language': language, 'error': str(e), 'retryAfter': e.retry_after}
+                    for language in languages]
+        finally:
+            started += time.time() - waited
+
+        # Téléchargements en parallèle (même proxy que l'extraction)
+        def run(language):
+            return download_track(video_id, info, language, exact, proxy, is_live)
+
+        if len(languages) == 1:
+            outcomes = [run(languages[0])]
+        else:
+            with ThreadPoolExecutor(max_workers=min(len(languages), MAX_PARALLEL_TRACKS)) as pool:
+                outcomes = list(pool.map(run, languages))
 
-        print(f"✅ {len(transcript_data)} segments parsés")
+        results = []
+        for result, upstream_error in outcomes:
+            proxy_blocked = proxy_blocked or upstream_error == 'blocked'
+            if upstream_error:
+                proxy_ok = False
+            results.append(result)
 
-        # Formatage
-        if format_type == 'srt':
-            content = format_as_srt(transcript_data)
-        elif format_type == 'vtt':
-            content = format_as_vtt(transcript_data)
-        else:
-            content = format_as_text(transcript_data)
-
-        return {
-            'videoId': video_id,
-            'language': selected_lang,
-            'format': format_type,
-            'content': content,
-            'lineCount': len(transcript_data),
-            'isAutoGenerated': is_auto,
-            'method': 'yt-dlp_2026_proxy'
-        }
+        if not exact and 'error' in results[0]:
+            raise SubtitleError(results[0]['error'])
+        return results
 
     except yt_dlp.utils.DownloadError as e:
         error_msg = str(e)
         if 'Video unavailable' in error_msg:
             raise SubtitleError('Vidéo non disponible')
-        if 'Sign in to confirm' in error_msg:
+        if is_antibot_error(error_msg):
+            proxy_blocked = True
             raise SubtitleError('Blocage anti-bot détecté - cookies nécessaires')
+        if is_network_error(error_msg):
+            proxy_ok = False
         if 'Requested format is not available' in error_msg:
             raise SubtitleError('Aucun format de sous-titres disponible pour cette vidéo')
         raise SubtitleError(f'Erreur yt-dlp : {error_msg}')
 
-    except SubtitleError:
+    except (SubtitleError, RateLimitTimeout):
         raise
 
     except Exception as e:
@@ -290,16 +611,122 @@ def get_subtitles(video_id, format_type='txt', language='fr'):
         print(f"❌ Erreur inattendue:\n{traceback.format_exc()}")
         raise SubtitleError(f'Erreur : {type(e).__name__} - {str(e)}')
 
+    finally:
+        release_proxy(proxy, started, success=proxy_ok, blocked=proxy_blocked)
+        release_cookies(cookies_file, started, success=proxy_ok, blocked=proxy_blocked)
+        release_upstream(upstream, success=proxy_ok, blocked=proxy_blocked)
+
+
+def select_track(info, language, exact=True):
+    """Choisit la piste d'une langue : (langue, formats, auto-générée) ou None."""
+    subtitles = info.get('subtitles') or {}
+    automatic_captions = info.get('automatic_captions') or {}
+
+    for lang in ([language] if exact else [language, 'fr', 'en']):
+        if lang in subtitles:
+            return lang, subtitles[lang], False
+        if lang in automatic_captions:
+            return lang, automatic_captions[lang], True
+
+    if exact:
+        return None
+
+    all_subs = {**automatic_captions, **subtitles}
+    selected_lang = list(all_subs.keys())[0]
+    return selected_lang, all_subs[selected_lang], selected_lang in automatic_captions
+
+
+def choose_format(subtitle_data):
+    """Meilleur format disponible pour une piste."""
+    for preferred_ext in ['json3', 'srv1', 'vtt', 'ttml']:
+        for fmt in subtitle_data:
+            if fmt.get('ext') == preferred_ext:
+                return fmt
+    return subtitle_data[0]
+
+
+def download_track(video_id, info, language, exact, proxy, is_live=False):
+    """
+    Télécharge et parse la piste d'une langue (créneau du limiteur pris par l'appelant).
+    Retourne (transcript ou {'language', 'error'}, erreur amont : None, 'blocked' ou 'network').
+    """
+    track = select_track(info, language, exact)
+    if track is None:
+        return {'language': language, 'error': 'Langue non disponible pour cette vidéo'}, None
+
+    selected_lang, subtitle_data, is_auto = track
+    if not subtitle_data:
+        return {'language': language, 'error': 'Données de sous-titres vides pour cette langue'}, None
+
+    chosen_fmt = choose_format(subtitle_data)
+    print(f"📥 Téléchargement [{selected_lang}] format [{chosen_fmt.get('ext')}]")
+
+    try:
+        raw_content = open_url(chosen_fmt['url'], proxy)
+    except Exception as e:
+        if is_antibot_error(str(e)):
+            upstream_error = 'blocked'
+        else:
+            upstream_error = 'network' if is_network_error(str(e)) else None
+        return ({'language': language,
+                 'error': f'Impossible de télécharger le fichier de sous-titres : {e}'},
+                upstream_error)
+
+    # Parsing
+    transcript_data = parse_caption(raw_content, chosen_fmt.get('ext', ''))
+
+    if not transcript_data:
+        return {'language': language, 'error': 'Impossible de parser le contenu des sous-titres'}, None
+
+    print(f"✅ [{selected_lang}] {len(transcript_data)} segments parsés")
+
+    transcript = {
+        'videoId': video_id,
+        'language': selected_lang,
+        'isAutoGenerated': is_auto,
+        'segments': transcript_data
+    }
+
+    # Live, première ou vidéo en cours de traitement : on garde l'URL de la piste
+    # pour les rafraîchissements incrémentaux
+    if is_live:
+        transcript['live'] = True
+        transcript['source'] = {'url': chosen_fmt['url'], 'ext': chosen_fmt.get('ext', '')}
+
+    return transcript, None
+
 
 # ==================== PARSEURS ====================
 
-def parse_youtube_json(json_data):
-    """Parse le format JSON3 natif de YouTube."""
+def parse_caption(raw_content, ext, after_ms=None):
+    """Parse une piste (JSON3, XML ou VTT). after_ms : ignore les événements déjà connus."""
+    transcript_data = []
+
+    if ext == 'json3' or raw_content.strip().startswith('{'):
+        try:
+            transcript_data = parse_youtube_json(json.loads(raw_content), after_ms)
+        except Exception as e:
+            print(f"⚠️  Parsing JSON3 échoué ({e}), tentative XML...")
+        if after_ms is not None:
+            return transcript_data
+
+    if not transcript_data:
+        transcript_data = parse_xml_subtitles(raw_content)
+        if after_ms is not None:
+            transcript_data = [seg for seg in transcript_data if segment_ms(seg) > after_ms]
+
+    return transcript_data
+
+
+def parse_youtube_json(json_data, after_ms=None):
+    """Parse le format JSON3 natif de YouTube (événements après after_ms uniquement si fourni)."""
     transcript = []
     try:
         for event in json_data.get('events', []):
             if 'segs' not in event:
                 continue
+            if after_ms is not None and event.get('tStartMs', 0) <= after_ms:
+                continue
             start = event.get('tStartMs', 0) / 1000.0
             duration = event.get('dDurationMs', 0) / 1000.0
             text = ''.join(seg.get('utf8', '') for seg in event['segs']).strip()
@@ -389,6 +816,18 @@ def parse_timestamp(ts_str):
 
 # ==================== FORMATEURS ====================
 
+def format_transcript(transcript_data, format_type='txt', first_index=1, header=True):
+    """
+    Formate les segments selon le type demandé.
+    first_index / header : numérotation SRT et en-tête WEBVTT pour les deltas.
+    """
+    if format_type == 'srt':
+        return format_as_srt(transcript_data, first_index)
+    if format_type == 'vtt':
+        return format_as_vtt(transcript_data, header)
+    return format_as_text(transcript_data)
+
+
 def format_as_text(transcript_data):
     """Texte brut lisible."""
     parts = [re.sub(r'\[.*?\]', '', e['text']).strip() for e in transcript_data]
@@ -397,19 +836,19 @@ def format_as_text(transcript_data):
     return full.strip()
 
 
-def format_as_srt(transcript_data):
+def format_as_srt(transcript_data, first_index=1):
     """Format SRT standard."""
     lines = []
-    for i, entry in enumerate(transcript_data, start=1):
+    for i, entry in enumerate(transcript_data, start=first_index):
         s = format_ts_srt(entry['start'])
         e = format_ts_srt(entry['start'] + entry['duration'])
         lines += [str(i), f"{s} --> {e}", entry['text'].strip(), '']
     return '\n'.join(lines)
 
 
-def format_as_vtt(transcript_data):
+def format_as_vtt(transcript_data, header=True):
     """Format WebVTT."""
-    lines = ['WEBVTT', '']
+    lines = ['WEBVTT', ''] if header else []
     for entry in transcript_data:
         s = format_ts_vtt(entry['start'])
         e = format_ts_vtt(entry['start'] + entry['duration'])
@@ -1,10 +1,11 @@
 import requests
 import re
 import xml.etree.ElementTree as ET
-import time
 import json
 from urllib.parse import unquote
 
+from ratelimit import acquire, report, upstream_keys
+
 class SubtitleError(Exception):
     pass
 
@@ -44,7 +45,10 @@ def get_subtitles_fallback(video_id, format_type='txt', language='fr'):
         for url in attempts:
             try:
                 print(f"🔄 Essai avec: {url}")
+                upstream = upstream_keys(url)
+                acquire(upstream)
                 response = requests.get(url, headers=headers, timeout=15)
+                report(upstream, blocked=response.status_code == 429)
                 
                 if response.status_code == 200 and response.content.strip():
                     used_url = url
@@ -59,8 +63,6 @@ def get_subtitles_fallback(video_id, format_type='txt', language='fr'):
                     break
                 else:
                     print(f"❌ Échec HTTP {response.status_code}")
-                    
-                time.sleep(0.5)
                 
             except requests.RequestException as e:
                 print(f"❌ Erreur réseau: {e}")
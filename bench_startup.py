@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Benchmark de démarrage à froid de l'API
+Mesure : temps d'import de l'application, temps jusqu'à la première réponse
+de /api/health, temps jusqu'à la première réponse de /api/subtitles.
+
+Exécutez : python bench_startup.py [--video ID] [--no-subtitles] [--output bench.jsonl]
+"""
+
+import argparse
+import json
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+def measure_import(module):
+    """Temps d'import d'un module dans un interpréteur neuf (secondes)."""
+    code = (
+        "import sys, time; sys.path.insert(0, 'api'); t = time.perf_counter(); "
+        f"import {module}; print(time.perf_counter() - t)"
+    )
+    output = subprocess.run([sys.executable, '-c', code], cwd=ROOT, capture_output=True, text=True)
+    if output.returncode != 0:
+        print(f"❌ Import de {module} impossible:\n{output.stderr}")
+        return None
+    return float(output.stdout.strip().splitlines()[-1])
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_server(port, data_dir):
+    """
+    Lance gunicorn (comme sur Render) ou, à défaut, le serveur Flask.
+    DATA_DIR neuf : cache et limiteur vides, la première demande est une vraie extraction.
+    """
+    env = dict(os.environ, PORT=str(port), FLASK_ENV='production', DATA_DIR=data_dir)
+    if shutil.which('gunicorn'):
+        cmd = ['gunicorn', '-c', 'gunicorn.conf.py', 'api.app:app']
+    else:
+        cmd = [sys.executable, 'api/app.py']
+    return subprocess.Popen(cmd, cwd=ROOT, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def wait_for_response(url, started, timeout):
+    """Interroge l'URL jusqu'à obtenir une réponse HTTP. Retourne (secondes, statut)."""
+    while time.perf_counter() - started < timeout:
+        try:
+            with urllib.request.urlopen(url, timeout=timeout) as response:
+                return time.perf_counter() - started, response.status
+        except urllib.error.HTTPError as e:
+            return time.perf_counter() - started, e.code
+        except (urllib.error.URLError, ConnectionError, socket.timeout):
+            time.sleep(0.05)
+    return None, None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--video', default='0ZZ6WpkoAww', help='vidéo pour la première demande de sous-titres')
+    parser.add_argument('--no-subtitles', action='store_true', help='ne mesure que le démarrage et /api/health')
+    parser.add_argument('--timeout', type=float, default=120)
+    parser.add_argument('--output', help='fichier JSONL où ajouter le résultat (suivi dans le temps)')
+    args = parser.parse_args()
+
+    print("\n" + "=" * 60)
+    print("⏱️  BENCHMARK DE DÉMARRAGE À FROID")
+    print("=" * 60)
+
+    result = {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'importApp': measure_import('app'),
+        'importSubtitles': measure_import('subtitles'),
+    }
+
+    port = free_port()
+    base = f'http://127.0.0.1:{port}'
+    data_dir = tempfile.mkdtemp(prefix='bench-startup-')
+    started = time.perf_counter()
+    server = start_server(port, data_dir)
+    try:
+        result['firstHealth'], _ = wait_for_response(f'{base}/api/health', started, args.timeout)
+
+        if not args.no_subtitles:
+            # Mesuré depuis le lancement du serveur, comme un utilisateur réveillant l'instance
+            elapsed, status = wait_for_response(
+                f'{base}/api/subtitles?videoId={args.video}&format=txt', started, args.timeout
+            )
+            result['firstSubtitles'], result['firstSubtitlesStatus'] = elapsed, status
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+    for key, value in result.items():
+        if isinstance(value, float):
+            print(f"   {key:22s}: {value * 1000:8.0f} ms")
+        else:
+            print(f"   {key:22s}: {value}")
+
+    if args.output:
+        with open(args.output, 'a') as f:
+            f.write(json.dumps(result) + '\n')
+        print(f"\n✅ Résultat ajouté à {args.output}")
+
+    return 0 if result['firstHealth'] is not None else 1
+
+
+if __name__ == '__main__':
+    exit(main())
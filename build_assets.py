@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Build des ressources statiques pour la production
+- empreinte (hash) dans le nom des images : icons/icon-192x192.<hash>.png
+- variantes précompressées .gz / .br des fichiers texte
+- dist/asset-manifest.json lu par api/app.py pour servir ces fichiers
+- CORE_CACHE_RESOURCES de service-worker.js généré depuis le même manifest
+
+Exécutez : python build_assets.py   (appelé par render.yaml au build)
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import re
+import shutil
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+DIST = os.path.join(ROOT, 'dist')
+MANIFEST_NAME = 'asset-manifest.json'
+
+# Pages et fichiers à URL fixe (servis en no-cache + ETag)
+PAGES = ['index.html', 'about.html', 'contact.html', 'privacy_policy.html', 'terms.html']
+STABLE_FILES = PAGES + ['manifest.json', 'service-worker.js']
+
+# Dossiers dont les fichiers reçoivent une empreinte (servis en immutable)
+FINGERPRINT_DIRS = ['icons', 'screenshots']
+
+# Ressources mises en cache à l'installation du service worker
+CORE_CACHE_FILES = ['index.html', 'manifest.json', 'privacy_policy.html']
+
+TEXT_EXTENSIONS = ('.html', '.json', '.js', '.css', '.svg', '.txt')
+
+SW_CORE_START = '// @build:core-cache-resources'
+SW_CORE_END = '// @end-build'
+
+
+def content_hash(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def fingerprinted_name(path, digest):
+    base, ext = os.path.splitext(path)
+    return f"{base}.{digest[:10]}{ext}"
+
+
+def write_variants(rel_path, data):
+    """Écrit le fichier et ses variantes compressées. Retourne les encodages disponibles."""
+    target = os.path.join(DIST, rel_path)
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    with open(target, 'wb') as f:
+        f.write(data)
+
+    encodings = []
+    if not rel_path.endswith(TEXT_EXTENSIONS):
+        return encodings
+
+    if brotli is not None:
+        compressed = brotli.compress(data, quality=11)
+        if len(compressed) < len(data):
+            with open(target + '.br', 'wb') as f:
+                f.write(compressed)
+            encodings.append('br')
+
+    compressed = gzip.compress(data, compresslevel=9, mtime=0)
+    if len(compressed) < len(data):
+        with open(target + '.gz', 'wb') as f:
+            f.write(compressed)
+        encodings.append('gzip')
+
+    return encodings
+
+
+def rewrite_references(text, fingerprinted):
+    """Remplace les URLs racine (/icons/x.png) par leur version avec empreinte."""
+    for logical in sorted(fingerprinted, key=len, reverse=True):
+        pattern = re.compile(r'''(["'(`])/''' + re.escape(logical) + r'''(?=["')`?#])''')
+        text = pattern.sub(lambda m: f"{m.group(1)}/{fingerprinted[logical]}", text)
+    return text
+
+
+def generate_core_cache(text, assets, build_id):
+    """Régénère CORE_CACHE_RESOURCES et la version du cache dans service-worker.js."""
+    start = text.find(SW_CORE_START)
+    end = text.find(SW_CORE_END, start)
+    if start == -1 or end == -1:
+        print("⚠️  Marqueurs absents de service-worker.js, liste CORE non générée")
+        return text
+
+    urls = ['/'] + [f"/{assets[name]['path']}" for name in CORE_CACHE_FILES if name in assets]
+    block = '\n'.join(
+        [SW_CORE_START, 'const CORE_CACHE_RESOURCES = ['] +
+        [f"  '{url}'," for url in urls[:-1]] + [f"  '{urls[-1]}'", '];', '']
+    )
+    text = text[:start] + block + text[end:]
+
+    # Nouvelle version de cache à chaque build : les anciennes entrées sont purgées
+    return re.sub(r"(const CACHE_VERSION = '[^']*?)(-[0-9a-f]{8})?';",
+                  lambda m: f"{m.group(1)}-{build_id}';", text, count=1)
+
+
+def main():
+    print("\n" + "=" * 60)
+    print("📦 BUILD DES RESSOURCES STATIQUES")
+    print("=" * 60)
+
+    shutil.rmtree(DIST, ignore_errors=True)
+    os.makedirs(DIST)
+
+    assets = {}
+    fingerprinted = {}
+
+    # 1. Fichiers avec empreinte
+    for directory in FINGERPRINT_DIRS:
+        for name in sorted(os.listdir(os.path.join(ROOT, directory))):
+            logical = f"{directory}/{name}"
+            with open(os.path.join(ROOT, logical), 'rb') as f:
+                data = f.read()
+            digest = content_hash(data)
+            path = fingerprinted_name(logical, digest)
+            fingerprinted[logical] = path
+            assets[logical] = {
+                'path': path,
+                'hash': digest[:32],
+                'immutable': True,
+                'encodings': write_variants(path, data),
+            }
+
+    # 2. Pages et fichiers à URL fixe, références réécrites
+    texts = {}
+    for name in STABLE_FILES:
+        with open(os.path.join(ROOT, name), encoding='utf-8') as f:
+            texts[name] = rewrite_references(f.read(), fingerprinted)
+
+    for name in STABLE_FILES:
+        if name == 'service-worker.js':
+            continue
+        data = texts[name].encode('utf-8')
+        assets[name] = {
+            'path': name,
+            'hash': content_hash(data)[:32],
+            'immutable': False,
+            'encodings': write_variants(name, data),
+        }
+
+    # 3. Service worker : liste CORE et version générées depuis le manifest
+    build_id = content_hash(json.dumps(assets, sort_keys=True).encode('utf-8'))[:8]
+    data = generate_core_cache(texts['service-worker.js'], assets, build_id).encode('utf-8')
+    assets['service-worker.js'] = {
+        'path': 'service-worker.js',
+        'hash': content_hash(data)[:32],
+        'immutable': False,
+        'encodings': write_variants('service-worker.js', data),
+    }
+
+    manifest = {'build': build_id, 'assets': assets}
+    with open(os.path.join(DIST, MANIFEST_NAME), 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+
+    for logical, entry in sorted(assets.items()):
+        encodings = ', '.join(entry['encodings']) or '-'
+        print(f"   {logical:40s} -> {entry['path']} [{encodings}]")
+    print(f"\n✅ {len(assets)} ressources dans dist/ (build {build_id})")
+    if brotli is None:
+        print("⚠️  Module brotli absent : seules les variantes gzip ont été générées")
+    return 0
+
+
+if __name__ == '__main__':
+    exit(main())
@@ -0,0 +1,50 @@
+# gunicorn.conf.py - YT Creator Tools
+# Utilisé par render.yaml : gunicorn -c gunicorn.conf.py api.app:app
+import os
+import threading
+
+bind = f"0.0.0.0:{os.getenv('PORT', '5000')}"
+workers = int(os.getenv('WEB_CONCURRENCY', 4))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 30))
+
+# Workers à threads : une extraction lente ne bloque plus tout le worker, et
+# api/admission.py borne les extractions simultanées (1 par worker par défaut, comme
+# les workers sync) et les long-polls ; le reste reçoit un 503 rapide.
+# Quelques threads restent toujours libres pour /api/health et les ressources statiques.
+worker_class = 'gthread'
+threads = int(os.getenv('GUNICORN_THREADS', 8))
+
+# File de connexions TCP en attente d'un thread : courte, pour refuser vite plutôt que
+# laisser les requêtes vieillir au-delà du timeout client
+backlog = int(os.getenv('GUNICORN_BACKLOG', 64))
+
+# L'application (Flask + modules légers) est chargée une fois dans le master,
+# puis partagée par fork : les workers démarrent sans réimporter.
+preload_app = True
+
+
+def post_worker_init(worker):
+    """
+    Publie la charge du worker dès son démarrage puis toutes les HEARTBEAT_INTERVAL
+    secondes (activeWorkers de /api/health compte aussi les workers inactifs).
+    Préchauffe la pile d'extraction (yt-dlp) en arrière-plan dans chaque worker :
+    /api/health répond tout de suite, la première demande de sous-titres
+    ne paie plus l'import. WARM_EXTRACTOR=0 pour désactiver.
+    """
+    from api.app import get_admission_controller
+    get_admission_controller().start_heartbeat()
+
+    if os.getenv('WARM_EXTRACTOR', '1') != '1':
+        return
+
+    def warm():
+        from api.app import extractor
+        extractor()
+
+    threading.Thread(target=warm, name='warm-extractor', daemon=True).start()
+
+
+def worker_exit(server, worker):
+    """Retire le worker de la charge de l'instance dès son arrêt."""
+    from api.app import get_admission_controller
+    get_admission_controller().forget()
@@ -1,14 +1,21 @@
 // service_worker.js - YT Creator Tools
-const CACHE_NAME = 'yt-creator-tools-v2.0.0';
-const CACHE_VERSION = 'v2.0.0';
+const CACHE_VERSION = 'v2.1.0';
+const CACHE_NAME = `yt-creator-tools-${CACHE_VERSION}`;
+
+// Cache dédié aux réponses GET /api/subtitles (stale-while-revalidate + ETag)
+const SUBTITLES_CACHE_NAME = 'yt-creator-tools-subtitles-v1';
+const SUBTITLES_API_PATH = '/api/subtitles';
 
 // Ressources critiques à mettre en cache immédiatement
+// (liste régénérée par build_assets.py depuis dist/asset-manifest.json)
+// @build:core-cache-resources
 const CORE_CACHE_RESOURCES = [
   '/',
   '/index.html',
   '/manifest.json',
   '/privacy_policy.html'
 ];
+// @end-build
 
 // Ressources supplémentaires à mettre en cache en arrière-plan
 const EXTENDED_CACHE_RESOURCES = [
@@ -85,7 +92,10 @@ self.addEventListener('fetch', event => {
   }
   
   // Stratégies de cache différentes selon le type de ressource
-  if (isNetworkFirstResource(url)) {
+  if (isSubtitlesApiResource(url)) {
+    // Stale While Revalidate (sous-titres, revalidés par ETag)
+    event.respondWith(subtitlesStaleWhileRevalidateStrategy(request));
+  } else if (isNetworkFirstResource(url)) {
     // Network First (APIs, images YouTube)
     event.respondWith(networkFirstStrategy(request));
   } else if (isCacheFirstResource(url)) {
@@ -199,10 +209,24 @@ function shouldIgnoreRequest(request) {
   if (url.startsWith('chrome-extension://')) return true;
   if (url.startsWith('moz-extension://')) return true;
   
+  // Les sous-titres en GET sont cacheables malgré le préfixe /api/
+  if (isSubtitlesApiResource(new URL(url))) return false;
+  
   // Ignorer certaines URLs
   return NEVER_CACHE_URLS.some(pattern => url.includes(pattern));
 }
 
+function isSubtitlesApiResource(url) {
+  // Les polls incrémentaux d'un live (since/cursor) vont toujours au réseau
+  return url.pathname === SUBTITLES_API_PATH && url.searchParams.has('videoId') &&
+         !url.searchParams.has('since') && !url.searchParams.has('cursor');
+}
+
+function isNoCacheResponse(response) {
+  const cacheControl = response.headers.get('Cache-Control') || '';
+  return /no-cache|no-store/.test(cacheControl);
+}
+
 function isNetworkFirstResource(url) {
   return NETWORK_FIRST_URLS.some(pattern => url.href.includes(pattern));
 }
@@ -301,6 +325,34 @@ async function staleWhileRevalidateStrategy(request) {
   return cachedResponse || fetchPromise;
 }
 
+// Stratégie Stale While Revalidate pour les sous-titres
+// La revalidation passe par le cache HTTP du navigateur (If-None-Match -> 304)
+async function subtitlesStaleWhileRevalidateStrategy(request) {
+  const cache = await caches.open(SUBTITLES_CACHE_NAME);
+  let cachedResponse = await cache.match(request);
+  
+  // Réponse marquée no-cache (live, copie expirée) : jamais servie avant le réseau
+  if (cachedResponse && isNoCacheResponse(cachedResponse)) {
+    cachedResponse = null;
+  }
+  
+  const fetchPromise = fetch(request)
+    .then(response => {
+      if (response.ok && !isNoCacheResponse(response)) {
+        cache.put(request, response.clone());
+      } else if (response.ok) {
+        cache.delete(request);
+      }
+      return response;
+    })
+    .catch(error => {
+      console.log('[SW] Erreur réseau pour:', request.url);
+      if (!cachedResponse) throw error;
+    });
+  
+  return cachedResponse || fetchPromise;
+}
+
 // Nettoyage des anciens caches
 async function cleanupOldCaches() {
   const cacheNames = await caches.keys();
@@ -308,7 +360,9 @@ async function cleanupOldCaches() {
   return Promise.all(
     cacheNames
       .filter(cacheName => {
-        return cacheName.startsWith('yt-creator-tools-') && cacheName !== CACHE_NAME;
+        return cacheName.startsWith('yt-creator-tools-') &&
+               cacheName !== CACHE_NAME &&
+               cacheName !== SUBTITLES_CACHE_NAME;
       })
       .map(cacheName => {
         console.log('[SW] Suppression ancien cache:', cacheName);
@@ -468,7 +522,9 @@ async function handleRequest(request) {
     return fetch(request);
   }
   
-  if (isNetworkFirstResource(url)) {
+  if (isSubtitlesApiResource(url)) {
+    return subtitlesStaleWhileRevalidateStrategy(request);
+  } else if (isNetworkFirstResource(url)) {
     return networkFirstStrategy(request);
   } else if (isCacheFirstResource(url)) {
     return cacheFirstStrategy(request);